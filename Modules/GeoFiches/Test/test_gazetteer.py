@@ -0,0 +1,32 @@
+import random
+
+from Modules.word_matcher import WordMatcher
+from Modules.GeoFiches.gazetteer import Gazetteer
+
+NAMES = ['каменный горка', 'горка', 'Минск', 'уфа', 'малиновка', 'р-н малиновка', '14', 'г.минск', ' в ', '']
+
+
+def test_search_same_as_word_matcher():
+    matcher = WordMatcher(NAMES)
+    gazetteer = Gazetteer(NAMES)
+    for data in ['каменный горка', 'массаж каменный горка', 'массаж каменный  горка', 'каменный горкай',
+                 'уфа', 'уфа-массаж', 'массаж в уфа!', 'уфаmassage', 'Massage Уфа', 'р-н малиновка',
+                 'массаж р-н малиновка', 'район 14', 'массаж г.минск', 'минск', '', ' ', 'массаж в минск']:
+        assert gazetteer.search(data) == matcher.search(data), data
+
+    generator = random.Random(1)
+    words = ['каменный', 'горка', 'уфа', 'минск', 'малиновка', 'массаж', 'р', 'н', '14', 'г']
+    separators = [' ', '  ', '-', '.', '!', ' в ', '']
+    for _ in range(2000):
+        data = ''.join(generator.choice(words) + generator.choice(separators)
+                       for _ in range(generator.randint(1, 4)))
+        assert gazetteer.search(data) == matcher.search(data), data
+
+
+def test_find_spans():
+    gazetteer = Gazetteer(NAMES)
+    data = 'массаж каменный горка и минск'
+    assert gazetteer.find(data) == [(7, 21, 'каменный горка'), (24, 29, 'минск')]
+    assert gazetteer.find('горка') == []
+    assert gazetteer.find('горка', whole=True) == [(0, 5, 'горка')]
+    assert gazetteer.find('каменный горка', whole=True) == [(0, 14, 'каменный горка')]
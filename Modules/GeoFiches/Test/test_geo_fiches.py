@@ -12,3 +12,71 @@
 # check_geo_include
 # geoService.check_geo_include('массаж на каменной горке', 'каменная горка') -> true
 # geoService.check_geo_include('массаж в Уфе', 'Уфа') -> true
+
+from Modules.GeoFiches.geo_fiches import GeoFiches
+from Modules.GeoFiches.gazetteer import Gazetteer
+
+LEMMAS = {'массаж': 'массаж', 'в': 'в', 'уфе': 'уфа', 'Уфе': 'уфа', 'минске': 'минск', 'цена': 'цена',
+          'каменной': 'каменный', 'горке': 'горка'}
+
+
+class DictTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def lemma(self, string: str) -> str:
+        self.calls += 1
+        return ' '.join(LEMMAS.get(word, word) for word in string.split(' '))
+
+    def lemma_batch(self, strings: list) -> list:
+        return [self.lemma(string) for string in strings]
+
+
+def test_delete_geo_with_word_lemmas():
+    tokenizer = DictTokenizer()
+    geo_fiches = GeoFiches(tokenizer)
+    queries = ['массаж в Уфе', 'цена массаж в минске', 'массаж  уфе']
+    word_lemmas = geo_fiches.word_lemmas(queries)
+    # Every distinct word is lemmatized once
+    assert tokenizer.calls == 7
+
+    expected = [geo_fiches.delete_geo(query, {'уфа', 'минск'}) for query in queries]
+    assert expected == ['массаж', 'цена массаж', 'массаж ']
+
+    tokenizer.calls = 0
+    assert [geo_fiches.delete_geo(query, {'уфа', 'минск'}, lemmas)
+            for query, lemmas in zip(queries, word_lemmas)] == expected
+    assert tokenizer.calls == 0
+
+
+def test_delete_geo_names_of_several_words():
+    geo_fiches = GeoFiches(DictTokenizer())
+    geos = Gazetteer({'каменный горка', 'уфа'})
+    assert geo_fiches.delete_geo('массаж на каменной горке цена', geos) == 'массаж цена'
+    assert geo_fiches.delete_geo('массаж каменной цена', geos) == 'массаж каменной цена'
+    assert geo_fiches.delete_geo('массаж В Уфе', geos) == 'массаж'
+    assert geo_fiches.delete_geo('Уфе', geos) == ''
+    assert geo_fiches.delete_geo('каменной горке', geos) == ''
+    assert geo_fiches.delete_geo('на каменной горке', geos) == ''
+    assert geo_fiches.delete_geo('массаж на каменной горке', {'каменный горка'}) == 'массаж'
+
+
+def test_clear_extract_geo_strips_first_prefix():
+    geo_fiches = GeoFiches(DictTokenizer())
+    assert geo_fiches.clear_extract_geo('в г.Минске') == 'минск'
+    assert geo_fiches.clear_extract_geo('у метро Уручье') == 'уручье'
+    assert geo_fiches.clear_extract_geo('мкр.Малиновка') == 'малиновка'
+    assert geo_fiches.clear_extract_geo('в Уфе') == 'уфа'
+
+
+def test_check_geos_include_lemmatizes_geos_once():
+    tokenizer = DictTokenizer()
+    geo_fiches = GeoFiches(tokenizer)
+    geos = {'Уфе', 'минске'}
+    assert geo_fiches.check_geos_include('массаж в уфе', geos) is True
+    assert geo_fiches.check_geos_include('массаж', geos) is False
+    calls = tokenizer.calls
+    assert geo_fiches.check_geos_include('', geos, 'массаж минск') is True
+    assert tokenizer.calls == calls
+    # Geo is found as substring of query lemma
+    assert geo_fiches.check_geos_include('', geos, 'массаж уфаспа') is True
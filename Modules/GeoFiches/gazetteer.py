@@ -0,0 +1,80 @@
+import re
+
+from Modules.word_matcher import WordMatcher, NOT_LETTER
+
+# Runs of letters and runs of not letters
+RUN_PATTERN = re.compile('[A-Za-zА-ЯЁа-яё]+|{0}+'.format(NOT_LETTER))
+LETTER_PATTERN = re.compile('[A-Za-zА-ЯЁа-яё]')
+
+
+class Gazetteer:
+    def __init__(self, names):
+        """
+            Trie of geo names (lemmas) split into runs of letters and not letters, matched in one pass over query.
+            Matching is the same as WordMatcher: name is bounded by not letters or by start/end of string
+            from one side, so string that is exactly the name is not matched.
+            Names starting or ending with not letter are matched by WordMatcher.
+            :param names: iterable of names
+        """
+        self.words = frozenset(str(name).lower() for name in names)
+
+        # Node: dict run -> node, None key marks end of name
+        self.trie = dict()
+        rest = list()
+        for name in self.words:
+            if len(name) == 0 or not LETTER_PATTERN.match(name[0]) or not LETTER_PATTERN.match(name[-1]):
+                rest.append(name)
+                continue
+
+            node = self.trie
+            for run in RUN_PATTERN.findall(name):
+                node = node.setdefault(run, dict())
+            node[None] = name
+
+        self.rest = WordMatcher(rest) if len(rest) > 0 else None
+
+    # Yield (start run, end run, name) of every name in runs
+    def _matches(self, runs: list):
+        for start in range(len(runs)):
+            node = self.trie.get(runs[start])
+            end = start + 1
+            while node is not None:
+                if None in node:
+                    yield start, end, node[None]
+                if end >= len(runs):
+                    break
+                node = node.get(runs[end])
+                end += 1
+
+    # Return true if one of names is included in data
+    def search(self, data: str) -> bool:
+        data = str(data).lower()
+        runs = RUN_PATTERN.findall(data)
+        for start, end, _ in self._matches(runs):
+            if start > 0 or end < len(runs):
+                return True
+        return self.rest is not None and self.rest.search(data)
+
+    # Return [(start, end, name)] char spans of names in data, longest from left to right, not overlapped.
+    # Name equal to whole data is reported only if whole.
+    # Names matched by WordMatcher (starting or ending with not letter) are not reported
+    def find(self, data: str, whole: bool = False) -> list:
+        data = str(data).lower()
+        runs = RUN_PATTERN.findall(data)
+        offsets = [0]
+        for run in runs:
+            offsets.append(offsets[-1] + len(run))
+
+        longest = dict()
+        for start, end, name in self._matches(runs):
+            if whole or start > 0 or end < len(runs):
+                longest[start] = (end, name)
+
+        spans = list()
+        position = 0
+        for start in sorted(longest):
+            if start >= position:
+                end, name = longest[start]
+                spans.append((offsets[start], offsets[end], name))
+                position = end
+        return spans
@@ -1,5 +1,7 @@
 import re
 
+from Modules.GeoFiches.gazetteer import Gazetteer
+
 PREFIXES = ('д.', 'п.', 'аг.', 'ст.', 'гп.', 'м.', 'р-н', 'мкр.', 'деревне', 'посёлке', 'агрогородке',
             'садоводческом товариществе', 'городском посёлке', 'районе', 'микрорайоне', 'у метро', 'м.', 'у м.',
             'городе', 'г.')
@@ -8,10 +10,15 @@ PREFIXES_LEMMA = ('город', 'метро', 'район', 'посёлок', '
 PREFIXES_LEMMA_WITHOUT_SPACES = ('город', 'метро', 'район', 'посёлок', 'микрорайон', 'деревня', 'агрогородок', 'в',
                                  'во', 'на', 'г.', 'г')
 
+# First of PREFIXES at start of string, alternatives are tried in order of PREFIXES
+PREFIXES_PATTERN = re.compile('^(?:' + '|'.join(re.escape(prefix) for prefix in PREFIXES) + ')')
+
 
 class GeoFiches:
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
+        # Set of clear_geos -> pattern of their lemmas
+        self.geo_patterns = dict()
 
     # Return lemma extract_geo without prefix
     def clear_extract_geo(self, extract_geo: str) -> str:
@@ -22,38 +29,76 @@ class GeoFiches:
         if result.find('во ') == 0:
             result = result[3:]
 
-        for prefix in PREFIXES:
-            if result.find(prefix) == 0:
-                result = result[len(prefix):]
-                break
+        result = PREFIXES_PATTERN.sub('', result, count=1)
 
         return self.lemma_of_query(result)
 
-    # Return query without clear_geos
-    def delete_geo(self, query: str, clear_geos: set) -> str:
+    # Return query without clear_geos and prepositions right before them. clear_geos - set of geo lemmas
+    # or Gazetteer of them. word_lemmas - lemmas of words of query made by word_lemmas (made if None)
+    def delete_geo(self, query: str, clear_geos, word_lemmas: list = None) -> str:
+        gazetteer = clear_geos if isinstance(clear_geos, Gazetteer) else Gazetteer(clear_geos)
         words = query.split(' ')
+        if word_lemmas is None:
+            word_lemmas = [self.tokenizer.lemma(word) for word in words]
+
+        # Word is geo if its lemma is geo or it is in span of geo name of several words
+        lemma = ' '.join(word_lemmas).lower()
+        starts = list()
+        position = 0
+        for word_lemma in word_lemmas:
+            starts.append(position)
+            position += len(word_lemma) + 1
+        geo_words = set(i for i, word_lemma in enumerate(word_lemmas) if word_lemma.lower() in gazetteer.words)
+        for start, end, _ in gazetteer.find(lemma, whole=True):
+            geo_words.update(i for i, word_start in enumerate(starts)
+                             if start < word_start + len(word_lemmas[i]) and word_start < end)
+
         new_query = []
-        for word in words:
-            if self.tokenizer.lemma(word) not in clear_geos:
+        for i, word in enumerate(words):
+            if i not in geo_words:
                 new_query.append(word)
-            elif len(new_query) > 0 and new_query[-1] in PREFIXES_LEMMA_WITHOUT_SPACES:
+            elif len(new_query) > 0 and new_query[-1].lower() in PREFIXES_LEMMA_WITHOUT_SPACES:
                 new_query = new_query[0:len(new_query) - 1]
 
         return ' '.join(new_query)
 
+    # Return lemmas of every word of queries (as split by delete_geo), distinct words are lemmatized by one batch
+    def word_lemmas(self, queries: list) -> list:
+        words = list(dict.fromkeys(word for query in queries for word in query.split(' ')))
+        lemmas = dict(zip(words, self.tokenizer.lemma_batch(words))) if len(words) > 0 else dict()
+        return [[lemmas[word] for word in query.split(' ')] for query in queries]
+
     # Return lemma of query without of prefixes_lemma and prepositions
     def lemma_of_query(self, query: str) -> str:
-        result = self.tokenizer.lemma(query)
+        return self.clear_lemma(self.tokenizer.lemma(query))
+
+    # Return lemmas of queries made by one tokenizer batch
+    def lemma_of_queries(self, queries: list) -> list:
+        return [self.clear_lemma(lemma) for lemma in self.tokenizer.lemma_batch(queries)]
+
+    # Return lemma without of prefixes_lemma and prepositions
+    @staticmethod
+    def clear_lemma(lemma: str) -> str:
+        result = lemma
         for prefix in PREFIXES_LEMMA:
             result = result.replace(prefix, ' ')
         result = re.sub(r'\s+', ' ', result)
         return result.strip()
 
-    # Return true if one of clear_geos in query
-    def check_geos_include(self, query: str, clear_geos: set) -> bool:
-        for clear_geo in clear_geos:
-            lemma_clear_geo = self.lemma_of_query(clear_geo)
-            lemma_of_query = self.lemma_of_query(query)
-            if lemma_of_query.find(lemma_clear_geo) != -1:
-                return True
-        return False
+    # Return true if one of clear_geos in query. query_lemma - lemma_of_query of query (made if None)
+    def check_geos_include(self, query: str, clear_geos: set, query_lemma: str = None) -> bool:
+        if len(clear_geos) == 0:
+            return False
+        if query_lemma is None:
+            query_lemma = self.lemma_of_query(query)
+        return self.get_geo_pattern(clear_geos).search(query_lemma) is not None
+
+    # Return pattern finding lemma of one of clear_geos as substring, geos are lemmatized once per set
+    def get_geo_pattern(self, clear_geos: set):
+        key = frozenset(clear_geos)
+        pattern = self.geo_patterns.get(key)
+        if pattern is None:
+            lemmas = set(self.lemma_of_queries(sorted(key)))
+            pattern = re.compile('|'.join(re.escape(lemma) for lemma in sorted(lemmas, key=len, reverse=True)))
+            self.geo_patterns[key] = pattern
+        return pattern
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from Modules.GoogleApi import google_search_console_api
+from Modules.GoogleApi.google_search_console_api import GoogleSearchConsoleApi
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self, http=None):
+        return self.result
+
+
+class SearchAnalytics:
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.bodies = []
+
+    def query(self, siteUrl, body):
+        self.bodies.append(body)
+        page = self.rows[body['startRow']:body['startRow'] + body['rowLimit']]
+        return Request({'rows': page} if len(page) > 0 else {})
+
+
+class Service:
+    def __init__(self, rows: list):
+        self.analytics = SearchAnalytics(rows)
+
+    def searchanalytics(self):
+        return self.analytics
+
+
+class Credentials:
+    def authorize(self, http):
+        return http
+
+
+@pytest.fixture
+def make_api(monkeypatch):
+    monkeypatch.setattr(google_search_console_api, 'ROW_LIMIT', 3)
+
+    def make(rows: list) -> GoogleSearchConsoleApi:
+        api = GoogleSearchConsoleApi.__new__(GoogleSearchConsoleApi)
+        api.auth_service = Service(rows)
+        api.credentials = Credentials()
+        api.local = threading.local()
+        return api
+    return make
+
+
+def row(page: str, query: str, clicks: int) -> dict:
+    return {'keys': [page, query], 'clicks': clicks, 'impressions': clicks * 10}
+
+
+def test_execute_paged_request(make_api):
+    rows = [row('https://site.by/', 'key ' + str(i), i) for i in range(7)]
+    api = make_api(rows)
+    assert api.execute_paged_request('https://site.by/', {'dimensions': ['page', 'query']}) == rows
+    # Pages are merged, paging stops on short page
+    assert [body['startRow'] for body in api.auth_service.analytics.bodies] == [0, 3, 6]
+    assert all(body['rowLimit'] == 3 and body['dimensions'] == ['page', 'query']
+               for body in api.auth_service.analytics.bodies)
+
+    # Full last page needs one more request returning no rows
+    api = make_api(rows[:6])
+    assert api.execute_paged_request('https://site.by/', {}) == rows[:6]
+    assert [body['startRow'] for body in api.auth_service.analytics.bodies] == [0, 3, 6]
+
+
+def test_get_keys_by_site(make_api):
+    rows = [row('https://site.by/a', 'massage', 5), row('https://site.by/b', 'price', 1),
+            row('https://site.by/a', 'massage price', 2), row('https://site.by/c', 'spa', 0),
+            row('https://site.by/b', 'massage', 3)]
+    api = make_api(rows)
+    assert api.get_keys_by_site('https://site.by/') == {
+        'https://site.by/a': [['massage', 5, 50], ['massage price', 2, 20]],
+        'https://site.by/b': [['price', 1, 10], ['massage', 3, 30]],
+        'https://site.by/c': [['spa', 0, 0]]
+    }
+    assert len(api.auth_service.analytics.bodies) == 2
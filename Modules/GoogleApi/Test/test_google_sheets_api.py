@@ -0,0 +1,43 @@
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from Modules.GoogleApi import google_sheets_api
+from Modules.GoogleApi.google_sheets_api import GoogleSheetsApi
+
+
+class Request:
+    def __init__(self, statuses: list):
+        self.statuses = statuses
+
+    def execute(self):
+        status, headers = self.statuses.pop(0)
+        if status != 200:
+            raise HttpError(httplib2.Response(dict(headers, status=status)), b'')
+        return {'values': []}
+
+
+@pytest.fixture
+def sheets_api(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(google_sheets_api.time, 'sleep', sleeps.append)
+    api = GoogleSheetsApi.__new__(GoogleSheetsApi)
+    api.request_count = 0
+    api.throttled_time = 0.0
+    api.sleeps = sleeps
+    return api
+
+
+def test_retry_after(sheets_api):
+    request = Request([(429, {'retry-after': '7'}), (503, {}), (200, {})])
+    assert sheets_api.execute(request) == {'values': []}
+    assert sheets_api.request_count == 3
+    assert 7 <= sheets_api.sleeps[0] < 8
+    assert google_sheets_api.RETRY_BACKOFF <= sheets_api.sleeps[1] < 3 * google_sheets_api.RETRY_BACKOFF
+    assert sheets_api.throttled_time >= sum(sheets_api.sleeps)
+
+
+def test_not_retried_error(sheets_api):
+    with pytest.raises(HttpError):
+        sheets_api.execute(Request([(400, {}), (200, {})]))
+    assert sheets_api.request_count == 1
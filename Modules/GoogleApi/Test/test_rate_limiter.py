@@ -0,0 +1,15 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Modules.GoogleApi.rate_limiter import RateLimiter
+
+
+def test_sliding_window():
+    limiter = RateLimiter(5, 0.2)
+    start = time.monotonic()
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda _: limiter.acquire(), range(12)))
+
+    # 12 calls by 5 per window need two full windows of waiting
+    assert time.monotonic() - start >= 0.4
+    assert limiter.throttled_time > 0
@@ -0,0 +1,114 @@
+from Modules.GoogleApi import sheets_report_builder
+from Modules.GoogleApi.google_sheets_api import GoogleSheetsApi
+from Modules.GoogleApi.sheets_report_builder import SheetsReportBuilder
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class Values:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.calls.append(('values', body))
+        return Request({})
+
+
+class Spreadsheets:
+    def __init__(self, sheets: dict):
+        self.sheets = sheets
+        self.calls = []
+
+    def get(self, spreadsheetId):
+        self.calls.append(('get', spreadsheetId))
+        return Request({'sheets': [{'properties': {'title': title, 'sheetId': sheet_id}}
+                                   for title, sheet_id in self.sheets.items()]})
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.calls.append(('requests', body))
+        return Request({})
+
+    def values(self):
+        return Values(self.calls)
+
+
+class Service:
+    def __init__(self, sheets: dict):
+        self.service = Spreadsheets(sheets)
+
+    def spreadsheets(self):
+        return self.service
+
+
+def make_api(sheets: dict) -> GoogleSheetsApi:
+    api = GoogleSheetsApi.__new__(GoogleSheetsApi)
+    api.auth_service = Service(sheets)
+    api.request_count = 0
+    api.throttled_time = 0.0
+    return api
+
+
+def test_values_chunks():
+    api = make_api({'Лист1': 0})
+    report = SheetsReportBuilder(api, 'doc', 'report')
+    report.add_sheet(25001, 4)
+    report.put_rows(1, 'A', [['id', 'query', 'clicks', 'impressions']])
+    report.put_rows(2, 'A', [[str(i), 'key', 0, 0] for i in range(25000)])
+    assert report.flush() == 6
+
+    calls = api.auth_service.service.calls
+    assert [call[0] for call in calls] == ['get', 'requests', 'values', 'values', 'values', 'values']
+    data = [values for call in calls if call[0] == 'values' for values in call[1]['data']]
+    assert [values['range'] for values in data] == ["'report'!A1", "'report'!A2", "'report'!A10002",
+                                                    "'report'!A20002"]
+    assert [len(values['values']) for values in data] == [1, 10000, 10000, 5000]
+    for call in calls:
+        if call[0] == 'values':
+            assert sum(len(values['values']) for values in call[1]['data']) <= sheets_report_builder.VALUES_CHUNK_ROWS
+    # Header and full chunk don't fit one call
+    assert [len(call[1]['data']) for call in calls if call[0] == 'values'] == [1, 1, 1, 1]
+
+    # Small ranges share one call
+    api = make_api({})
+    report = SheetsReportBuilder(api, 'doc', 'report')
+    report.put_rows(1, 'A', [['header']])
+    report.put_rows(2, 'A', [['row']] * 9999)
+    report.put_rows(10001, 'A', [['row']])
+    assert report.flush() == 2
+    assert [len(call[1]['data']) for call in api.auth_service.service.calls if call[0] == 'values'] == [2, 1]
+
+
+def test_requests_chunks_and_replace():
+    api = make_api({'report': 7})
+    report = SheetsReportBuilder(api, 'doc', 'report')
+    report.add_sheet()
+    for i in range(2500):
+        report.add_group(i, i + 1)
+    assert report.flush() == 4
+
+    requests = [call[1]['requests'] for call in api.auth_service.service.calls if call[0] == 'requests']
+    assert [len(chunk) for chunk in requests] == [1000, 1000, 502]
+    assert requests[0][0] == {'deleteSheet': {'sheetId': 7}}
+    assert requests[0][1]['addSheet']['properties']['sheetId'] == report.sheet_id
+    assert all(request['addDimensionGroup']['range']['sheetId'] == report.sheet_id
+               for chunk in requests for request in chunk if 'addDimensionGroup' in request)
+
+
+def test_sheet_id_not_taken():
+    api = make_api({})
+    report = SheetsReportBuilder(api, 'doc', 'report')
+    report.add_sheet()
+    sheet_id = report.sheet_id
+    assert 1 <= sheet_id <= sheets_report_builder.MAX_SHEET_ID
+
+    # Same name gives same id, id of other sheet is skipped
+    api = make_api({'other': sheet_id, 'next': sheet_id % sheets_report_builder.MAX_SHEET_ID + 1})
+    report = SheetsReportBuilder(api, 'doc', 'report')
+    report.add_sheet()
+    assert report.sheet_id not in (sheet_id, sheet_id % sheets_report_builder.MAX_SHEET_ID + 1)
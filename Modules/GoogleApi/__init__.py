@@ -1,2 +1,3 @@
 from .google_sheets_api import GoogleSheetsApi
-from .google_search_console_api import GoogleSearchConsoleApi
\ No newline at end of file
+from .google_search_console_api import GoogleSearchConsoleApi
+from .sheets_report_builder import SheetsReportBuilder
@@ -1,67 +1,109 @@
 import httplib2
+import threading
 from googleapiclient import discovery
 from oauth2client.service_account import ServiceAccountCredentials
 import datetime
 from dateutil.relativedelta import *
 
+from .rate_limiter import RateLimiter
+
 # Report 16 month earlier
 COUNT_OF_DAYS_STATISTIC = 30 * 16
+# Maximum 25K rows per call
+ROW_LIMIT = 25000
+# Search Analytics quota per site and per user
+REQUESTS_PER_MINUTE = 1200
+
+# Shared by all GoogleSearchConsoleApi of process
+LIMITER = RateLimiter(REQUESTS_PER_MINUTE, 60)
 
 
 class GoogleSearchConsoleApi:
     def __init__(self, token):
         self.auth_service = None
+        self.credentials = None
+        self.local = threading.local()
         self.authorization(token)
 
     # Authorisation in serves google
     # Accept: authorisation token
     def authorization(self, token: str):
-        credentials = ServiceAccountCredentials.from_json_keyfile_name(
+        self.credentials = ServiceAccountCredentials.from_json_keyfile_name(
             token,
             ['https://www.googleapis.com/auth/webmasters.readonly'])
-        http_auth = credentials.authorize(httplib2.Http())
+        http_auth = self.credentials.authorize(httplib2.Http())
         self.auth_service = discovery.build('searchconsole', 'v1', http=http_auth)
 
+    # Return authorized http of current thread, httplib2.Http can't be shared by threads
+    def get_http(self):
+        if getattr(self.local, 'http', None) is None:
+            self.local.http = self.credentials.authorize(httplib2.Http())
+        return self.local.http
+
     # Execute request to domain by request
     def execute_request(self, domain: str, request: dict):
-        return self.auth_service.searchanalytics().query(siteUrl=domain, body=request).execute()
+        LIMITER.acquire()
+        return self.auth_service.searchanalytics().query(siteUrl=domain, body=request).execute(http=self.get_http())
 
-    # Return list of [key, clicks, impressions]
-    def get_keys_by_url(self, domain: str, root: str, start_date: datetime = None, end_date: datetime = None):
+    # Return all rows of request, pages through startRow until rows are exhausted
+    def execute_paged_request(self, domain: str, request: dict) -> list:
+        rows = []
+        start_row = 0
+        while True:
+            response = self.execute_request(domain, dict(request, rowLimit=ROW_LIMIT, startRow=start_row))
+            page = response.get('rows', [])
+            rows += page
+            if len(page) < ROW_LIMIT:
+                return rows
+            start_row += ROW_LIMIT
+
+    # Return request body of statistic in [start_date, end_date] (last COUNT_OF_DAYS_STATISTIC if None)
+    @staticmethod
+    def get_request_body(dimensions: list, start_date: datetime = None, end_date: datetime = None) -> dict:
         if start_date is None or end_date is None:
             end_date = datetime.date.today() - relativedelta(days=1)
             start_date = end_date - relativedelta(days=COUNT_OF_DAYS_STATISTIC)
 
-        maxRows = 25000  # Maximum 25K per call
-        numRows = 0  # Start at Row Zero
-
-        request = {
+        return {
             'startDate': datetime.datetime.strftime(start_date, '%Y-%m-%d'),
             'endDate': datetime.datetime.strftime(end_date, '%Y-%m-%d'),
-            'rowLimit': maxRows,
-            'startRow': numRows,
-            "dimensions": [
-                "query"
-            ],
-            "dimensionFilterGroups": [
-                {
-                    "filters": [
-                        {
-                            "dimension": "PAGE",
-                            "operator": "EQUALS",
-                            "expression": domain+root
-                        }
-                    ]
-                }
-            ]
+            "dimensions": dimensions
         }
+
+    # Return list of [key, clicks, impressions]
+    def get_keys_by_url(self, domain: str, root: str, start_date: datetime = None, end_date: datetime = None):
+        request = self.get_request_body(["query"], start_date, end_date)
+        request["dimensionFilterGroups"] = [
+            {
+                "filters": [
+                    {
+                        "dimension": "PAGE",
+                        "operator": "EQUALS",
+                        "expression": domain+root
+                    }
+                ]
+            }
+        ]
         results = []
 
         try:
-            responce = self.execute_request(domain, request)
-            for row in responce['rows']:
+            for row in self.execute_paged_request(domain, request):
                 results.append([str(row['keys'][0]), int(row['clicks']), int(row['impressions'])])
         except Exception as e:
             raise Exception("Can't download stats. Error:\n"+str(e))
 
         return results
+
+    # Return dict page -> list of [key, clicks, impressions] of all pages of domain by one paged request
+    def get_keys_by_site(self, domain: str, start_date: datetime = None, end_date: datetime = None) -> dict:
+        request = self.get_request_body(["page", "query"], start_date, end_date)
+        results = dict()
+
+        try:
+            for row in self.execute_paged_request(domain, request):
+                results.setdefault(str(row['keys'][0]), []).append(
+                    [str(row['keys'][1]), int(row['clicks']), int(row['impressions'])])
+        except Exception as e:
+            raise Exception("Can't download stats. Error:\n"+str(e))
+
+        return results
@@ -1,15 +1,29 @@
 import httplib2
 import time
+import random
 from googleapiclient import discovery
+from googleapiclient.errors import HttpError
 from oauth2client.service_account import ServiceAccountCredentials
 
+from .rate_limiter import RateLimiter
+
+# Sheets API quota per user
+REQUESTS_PER_MINUTE = 60
+# Tries of request answered with 429/503
+REQUEST_RETRIES = 5
+# Sleep before retry without Retry-After is RETRY_BACKOFF * 2 ** attempt + jitter seconds
+RETRY_BACKOFF = 2
+RETRY_STATUSES = (429, 503)
+
+# Shared by all GoogleSheetsApi of process
+LIMITER = RateLimiter(REQUESTS_PER_MINUTE, 60)
+
 
 class GoogleSheetsApi:
     def __init__(self, token):
         self.auth_service = None
         self.request_count = 0
-        self.request_limit = 60
-        self.request_sleep = 200
+        self.throttled_time = 0.0
         self.authorization(token)
 
     # Authorisation in serves google
@@ -20,22 +34,36 @@ class GoogleSheetsApi:
             ['https://www.googleapis.com/auth/spreadsheets'])
         http_auth = credentials.authorize(httplib2.Http())
         self.auth_service = discovery.build('sheets', 'v4', http=http_auth)
-        self.request_count += 1
+
+    # Execute request within quota. Answers 429/503 are retried after Retry-After or jittered backoff.
+    # Time spent waiting is added to throttled_time.
+    def execute(self, request):
+        for i in range(REQUEST_RETRIES):
+            self.throttled_time += LIMITER.acquire()
+            self.request_count += 1
+            try:
+                return request.execute()
+            except HttpError as e:
+                if e.resp.status not in RETRY_STATUSES or i == REQUEST_RETRIES - 1:
+                    raise
+
+                retry_after = e.resp.get('retry-after')
+                if retry_after is not None and str(retry_after).isdigit():
+                    wait = int(retry_after) + random.uniform(0, 1)
+                else:
+                    wait = RETRY_BACKOFF * 2 ** i + random.uniform(0, RETRY_BACKOFF)
+                self.throttled_time += wait
+                time.sleep(wait)
 
     # Get data from document table_id, sheet list_name in range [start_range_point, end_range_point]
     # Return: mas with data with major_dimension (ROWS/COLUMNS)
     def get_data_from_sheets(self, table_id: str, list_name: str, start_range_point: str,
                              end_range_point: str, major_dimension: str):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
-        values = self.auth_service.spreadsheets().values().get(
+        values = self.execute(self.auth_service.spreadsheets().values().get(
             spreadsheetId=table_id,
             range="'{0}'!{1}:{2}".format(list_name, start_range_point, end_range_point),
             majorDimension=major_dimension
-        ).execute()
+        ))
 
         return values['values']
 
@@ -44,12 +72,7 @@ class GoogleSheetsApi:
     def put_data_to_sheets(self, table_id: str, list_name: str, start_range_point: str, end_range_point: str,
                            major_dimension: str, data: list):
 
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
-        values = self.auth_service.spreadsheets().values().batchUpdate(
+        values = self.execute(self.auth_service.spreadsheets().values().batchUpdate(
             spreadsheetId=table_id,
             body={
                 "valueInputOption": "USER_ENTERED",
@@ -58,7 +81,7 @@ class GoogleSheetsApi:
                     "majorDimension": major_dimension,
                     "values": data
                 }]
-            }).execute()
+            }))
 
     # Put data to document table_id, sheet list_name in column column(char) and range [start_row, start_row+len(data)]
     def put_column_to_sheets(self, table_id: str, list_name: str, column: str, start_row: int, data: list):
@@ -76,17 +99,12 @@ class GoogleSheetsApi:
 
     # Get sheet_id of list_name in document table_id"""
     def get_sheet_id(self, table_id: str, list_name: str):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
+        return self.get_sheet_ids(table_id).get(list_name)
 
-        spreadsheet = self.auth_service.spreadsheets().get(spreadsheetId=table_id).execute()
-        sheet_id = None
-        for _sheet in spreadsheet['sheets']:
-            if _sheet['properties']['title'] == list_name:
-                sheet_id = _sheet['properties']['sheetId']
-        return sheet_id
+    # Return dict title -> sheetId of all sheets of document table_id
+    def get_sheet_ids(self, table_id: str) -> dict:
+        spreadsheet = self.execute(self.auth_service.spreadsheets().get(spreadsheetId=table_id))
+        return {_sheet['properties']['title']: _sheet['properties']['sheetId'] for _sheet in spreadsheet['sheets']}
 
     # Generate spreadsheets request for colorizing range in table
     # Accept: document table_id, sheet list_name, start_column(int), start_row(int), end_column(int), end_row(int)
@@ -130,30 +148,20 @@ class GoogleSheetsApi:
 
     # Apply spreadsheets requests on document table_id
     def apply_spreadsheets_requests(self, table_id, requests):
-        self.request_count += 1
-        self.auth_service.spreadsheets().batchUpdate(
+        self.execute(self.auth_service.spreadsheets().batchUpdate(
             spreadsheetId=table_id,
-            body={"requests": [requests]}).execute()
+            body={"requests": [requests]}))
 
     # Clear sheet list_name in document table_id
     def clear_sheet(self, table_id, list_name):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
         range_all = '{0}!A1:Z'.format(list_name)
-        self.auth_service.spreadsheets().values().clear(spreadsheetId=table_id, range=range_all, body={}).execute()
+        self.execute(self.auth_service.spreadsheets().values().clear(spreadsheetId=table_id, range=range_all,
+                                                                     body={}))
 
     # Get sizes of sheet list_name in document table_id"""
     # Return [column_count, row_count]
     def get_list_size(self, table_id, list_name):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
-        request = self.auth_service.spreadsheets().get(spreadsheetId=table_id, ranges=list_name).execute()
+        request = self.execute(self.auth_service.spreadsheets().get(spreadsheetId=table_id, ranges=list_name))
         return [request['sheets'][0]['properties']['gridProperties']['columnCount'],
                 request['sheets'][0]['properties']['gridProperties']['rowCount']]
 
@@ -186,11 +194,6 @@ class GoogleSheetsApi:
     # Create new sheet in document
     # Accept: document_id and name of the new sheet
     def create_sheet(self, document_id, list_name, row_count=1000, column_count=26):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
         request = {
                     "addSheet": {
                         "properties": {
@@ -203,22 +206,19 @@ class GoogleSheetsApi:
                     }
                 }
 
-        self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id, body={"requests": [request]}).execute()
+        self.execute(self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id,
+                                                                  body={"requests": [request]}))
 
     # Delete sheet from document
     # Accept: document_id and name of the sheet to delete
     def delete_sheet(self, document_id, list_name):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
         request = {
                     "deleteSheet": {
                         "sheetId": self.get_sheet_id(document_id, list_name),
                     }
                 }
-        self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id, body={"requests": [request]}).execute()
+        self.execute(self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id,
+                                                                  body={"requests": [request]}))
 
     # Add colorizing conditional formatting to document document_id, list list_name in rage start_column:start_row
     # end_column:end_row with rule type with value and color [0..1]
@@ -253,15 +253,11 @@ class GoogleSheetsApi:
                 'index': 0
             }
         }
-        self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id, body={"requests": [request]}).execute()
+        self.execute(self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id,
+                                                                  body={"requests": [request]}))
 
     # Create group in sheet list_name
     def create_group(self, document_id: str, list_name: str, start: int, end: int, dimension: str):
-        self.request_count += 1
-        if self.request_count >= self.request_limit:
-            self.request_count = 0
-            time.sleep(self.request_sleep)
-
         body = {
             "requests": [
                 {
@@ -277,4 +273,4 @@ class GoogleSheetsApi:
             ]
         }
 
-        self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id, body=body).execute()
\ No newline at end of file
+        self.execute(self.auth_service.spreadsheets().batchUpdate(spreadsheetId=document_id, body=body))
\ No newline at end of file
@@ -0,0 +1,37 @@
+import time
+from collections import deque
+from threading import Lock
+
+
+class RateLimiter:
+    def __init__(self, max_calls: int, period: float):
+        """
+            Sliding window limiter shared by threads: at most max_calls calls in any period seconds
+            :param max_calls: count of calls in window
+            :param period: window size in seconds
+        """
+        self.max_calls = max_calls
+        self.period = period
+
+        self.calls = deque()
+        self.lock = Lock()
+        self.throttled_time = 0.0
+
+    # Wait until call is allowed, return waited seconds
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while len(self.calls) > 0 and self.calls[0] <= now - self.period:
+                    self.calls.popleft()
+
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return waited
+
+                wait = self.calls[0] + self.period - now
+                self.throttled_time += wait
+
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,109 @@
+import zlib
+
+from .google_sheets_api import GoogleSheetsApi
+
+# Payload limits: rows written by one values batchUpdate, requests sent by one spreadsheets batchUpdate
+VALUES_CHUNK_ROWS = 10000
+REQUESTS_CHUNK = 1000
+# Sheet ids are in [1, MAX_SHEET_ID]
+MAX_SHEET_ID = 2 ** 31 - 1
+
+
+class SheetsReportBuilder:
+    def __init__(self, sheets_api: GoogleSheetsApi, document_id: str, list_name: str):
+        """
+            Collects sheet creation, values and groups of report and writes them by fewest batchUpdate calls
+            :param sheets_api: authorized GoogleSheetsApi
+            :param document_id: id of document
+            :param list_name: name of sheet of report
+        """
+        self.sheets_api = sheets_api
+        self.document_id = document_id
+        self.list_name = list_name
+
+        self.sheet_id = None
+        self.old_sheet_id = None
+        self.requests = []
+        self.values = []
+        self.api_calls = 0
+
+    # Create sheet with sizes, existing sheet with same name is deleted if replace.
+    # Sheet id is derived from name and moved to next free id if the document has it
+    def add_sheet(self, row_count: int = 1000, column_count: int = 26, replace: bool = True):
+        sheet_ids = self.sheets_api.get_sheet_ids(self.document_id)
+        self.api_calls += 1
+        if replace:
+            self.old_sheet_id = sheet_ids.get(self.list_name)
+
+        taken = set(sheet_ids.values())
+        self.sheet_id = zlib.crc32(self.list_name.encode('utf-8')) % MAX_SHEET_ID + 1
+        while self.sheet_id in taken:
+            self.sheet_id = self.sheet_id % MAX_SHEET_ID + 1
+        self.requests.append({
+            "addSheet": {
+                "properties": {
+                    "sheetId": self.sheet_id,
+                    "title": self.list_name,
+                    "gridProperties": {
+                        "rowCount": row_count,
+                        "columnCount": column_count
+                    }
+                }
+            }
+        })
+
+    # Put rows to sheet from row start_row (from 1) and column start_column (char)
+    def put_rows(self, start_row: int, start_column: str, rows: list):
+        for i in range(0, len(rows), VALUES_CHUNK_ROWS):
+            self.values.append({
+                "range": "'{0}'!{1}{2}".format(self.list_name, start_column, start_row + i),
+                "majorDimension": 'ROWS',
+                "values": rows[i:i + VALUES_CHUNK_ROWS]
+            })
+
+    # Group dimension (ROWS/COLUMNS) in [start, end)
+    def add_group(self, start: int, end: int, dimension: str = 'ROWS'):
+        self.requests.append({
+            "addDimensionGroup": {
+                "range": {
+                    "dimension": dimension,
+                    "sheetId": self.sheet_id,
+                    "startIndex": start,
+                    "endIndex": end
+                }
+            }
+        })
+
+    # Send collected requests, return count of API calls
+    def flush(self) -> int:
+        spreadsheets = self.sheets_api.auth_service.spreadsheets()
+        requests = self.requests
+        if self.old_sheet_id is not None:
+            requests = [{"deleteSheet": {"sheetId": self.old_sheet_id}}] + requests
+            self.old_sheet_id = None
+
+        for i in range(0, len(requests), REQUESTS_CHUNK):
+            self.sheets_api.execute(spreadsheets.batchUpdate(
+                spreadsheetId=self.document_id,
+                body={"requests": requests[i:i + REQUESTS_CHUNK]}))
+            self.api_calls += 1
+
+        rows = 0
+        data = []
+        for values in self.values + [None]:
+            if values is None or (rows + len(values['values']) > VALUES_CHUNK_ROWS and len(data) > 0):
+                if len(data) > 0:
+                    self.sheets_api.execute(spreadsheets.values().batchUpdate(
+                        spreadsheetId=self.document_id,
+                        body={"valueInputOption": "USER_ENTERED", "data": data}))
+                    self.api_calls += 1
+                rows = 0
+                data = []
+
+            if values is not None:
+                data.append(values)
+                rows += len(values['values'])
+
+        self.requests = []
+        self.values = []
+        return self.api_calls
@@ -0,0 +1,84 @@
+import pickle
+
+import pytest
+
+from Modules.checkpoint_store import CheckpointStore
+from Modules.сlusterer_search_keys import ClustererSearchKeysService, query_worker
+
+CONFIG = {
+    'XMLRiver': {
+        'xml_river_user': 'user',
+        'xml_river_key': 'key',
+        'group_by': 10,
+        'Google': {
+            'default_country_id': 2112,
+            'default_loc_id': 1001493,
+            'default_language_id': 'RU',
+            'default_device': 'desktop',
+            'default_use_language': False
+        }
+    }
+}
+
+
+class River:
+    def get_query_items_with_params(self, key: str) -> dict:
+        if key == 'ошибка':
+            raise Exception('timeout')
+        return {'sites': [], 'relatives': [key + ' цена']}
+
+
+def test_stages_and_rows(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoint.sqlite'))
+    assert store.load_last_stage() is None
+
+    store.save_stage(0, {'queries': [['ключ', -1, -1]]})
+    store.save_stage(1, {'queries': []})
+    assert store.load_last_stage() == (1, {'queries': []})
+
+    store.put_row('ключ', ('ключ', 'https://a.by/', 'a|b', ''))
+    assert store.get_rows(['ключ', 'нет']) == {'ключ': ('ключ', 'https://a.by/', 'a|b', '')}
+
+    # Workers get store without connection
+    assert pickle.loads(pickle.dumps(store)).get_rows(['ключ']) == store.get_rows(['ключ'])
+
+    store.clear()
+    assert store.stats() == {'stages': 0, 'rows': 0}
+
+
+def test_saved_keys_are_not_requested_again(tmp_path):
+    service = ClustererSearchKeysService('', 'GOOGLE', CONFIG, checkpoint_path=str(tmp_path / 'c.sqlite'))
+    requested = []
+
+    def request_keys(keys, on_row):
+        requested.extend(keys)
+        for i, key in enumerate(keys):
+            on_row(i, (key, 'https://' + key, '', ''))
+
+    service.request_keys = request_keys
+    assert service.query_keys(['a', 'b']) == [('a', 'https://a', '', ''), ('b', 'https://b', '', '')]
+    assert service.query_keys(['c', 'b', 'a']) == [('c', 'https://c', '', ''), ('b', 'https://b', '', ''),
+                                                   ('a', 'https://a', '', '')]
+    assert requested == ['a', 'b', 'c']
+
+
+
+def test_pool_workers_get_only_river():
+    service = ClustererSearchKeysService('', 'GOOGLE', CONFIG)
+    service.river = River()
+    # Not picklable state of service must not reach workers
+    service.lock = pickle
+    rows = dict()
+    service.request_keys(['a', 'b'], lambda index, row: rows.__setitem__(index, row))
+    assert rows == {0: ('a', '', 'a цена', ''), 1: ('b', '', 'b цена', '')}
+    assert query_worker(River(), 'c') == ('c', '', 'c цена', '')
+
+
+def test_query_worker_is_not_retried():
+    river = River()
+    calls = []
+    request = river.get_query_items_with_params
+    river.get_query_items_with_params = lambda key: calls.append(key) or request(key)
+    with pytest.raises(Exception, match='Stopped in ошибка error: timeout'):
+        query_worker(river, 'ошибка')
+    assert calls == ['ошибка']
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+
+from Modules.сlusterer_service import ClusteringService, IncrementalClustering
+
+
+def get_urls_data(seed: int, count: int = 200) -> list:
+    generator = random.Random(seed)
+    urls = ['site{0}.by/page'.format(i) for i in range(40)]
+    data = [' '.join(generator.sample(urls[:generator.randint(10, 40)], 10)) for _ in range(count)]
+    return data + ['', ' ', data[3], 'A b', 'a B b']
+
+
+def test_vectorized_same_as_reference():
+    matrix = np.array([
+        [1.0, 0.9, 0.8, 0.1, 0.85],
+        [0.9, 1.0, 0.5, 0.2, 0.81],
+        [0.8, 0.5, 1.0, 0.3, 0.9],
+        [0.1, 0.2, 0.3, 0.0, 0.1],
+        [0.85, 0.81, 0.9, 0.1, 1.0],
+    ])
+    for duplicates_uniqueness in (1.0, 0.85, 0.8, 0.5, 0.0):
+        reference = ClusteringService.cluster(matrix, matrix, duplicates_uniqueness, mode='reference')
+        vectorized = ClusteringService.cluster(matrix, matrix, duplicates_uniqueness)
+        assert reference == vectorized
+
+    assert ClusteringService.cluster(matrix, matrix, 0.8) == [0, 0, 2, -1, 0]
+
+
+def test_vectorized_same_as_reference_on_urls():
+    for seed in range(3):
+        vectors, matrix = ClusteringService.get_duplicate_matrix(get_urls_data(seed))
+        for duplicates_uniqueness in (1.0, 0.8, 0.6, 0.3):
+            reference = ClusteringService.cluster(vectors, matrix, duplicates_uniqueness, mode='reference')
+            assert ClusteringService.cluster(vectors, matrix, duplicates_uniqueness) == reference
+
+
+def test_similarity_graph_same_as_dense():
+    data = get_urls_data(7)
+    vectors, matrix = ClusteringService.get_duplicate_matrix(data)
+    for duplicates_uniqueness in (1.0, 0.8, 0.6, 0.3):
+        reference = ClusteringService.cluster(vectors, matrix, duplicates_uniqueness, mode='reference')
+        assert ClusteringService.cluster_list(data, duplicates_uniqueness) == reference
+
+        _, graph = ClusteringService.get_similarity_graph(data, duplicates_uniqueness, block_size=16)
+        assert ClusteringService.cluster(vectors, graph, duplicates_uniqueness) == reference
+
+
+def test_exact_duplicates_same_as_dense():
+    data = get_urls_data(3, 50) + ['b  a', 'a b a b', 'Мастер  на час', 'на час мастер', 'час', '  ']
+    vectors, matrix = ClusteringService.get_duplicate_matrix(data)
+    reference = ClusteringService.cluster(vectors, matrix, 1.0, mode='reference')
+    assert ClusteringService.exact_duplicates(data) == reference
+    assert ClusteringService.cluster_list(data, 1) == reference
+
+
+def test_group_clusters_keeps_order():
+    clusters = [3, -1, 3, 0, -1, 0, 3]
+    groups = ClusteringService.group_clusters(clusters)
+    assert list(groups.keys()) == [3, -1, 0]
+    assert groups == {3: [0, 2, 6], -1: [1, 4], 0: [3, 5]}
+
+
+def test_incremental_same_as_batch():
+    data = get_urls_data(11) + get_urls_data(12, 100)
+    for duplicates_uniqueness in (1.0, 0.8, 0.6, 0.3):
+        clustering = IncrementalClustering(duplicates_uniqueness)
+        for start in (1, 150, 151, 260):
+            clustering.add(data[len(clustering):start])
+            assert clustering.clusters == ClusteringService.cluster_list(data[:start], duplicates_uniqueness)
+        clustering.add(data[len(clustering):])
+        assert clustering.clusters == ClusteringService.cluster_list(data, duplicates_uniqueness)
+
+
+def test_cluster_list_multi_same_as_single():
+    data = get_urls_data(5)
+    for thresholds in ([0.8, 0.6], [1.0, 0.3, 0.8, 0.3], [0.6, 0.0]):
+        clusters = ClusteringService.cluster_list_multi(data, thresholds)
+        assert list(clusters.keys()) == list(dict.fromkeys(thresholds))
+        for duplicates_uniqueness in thresholds:
+            assert clusters[duplicates_uniqueness] == ClusteringService.cluster_list(data, duplicates_uniqueness)
+
+
+def test_prefix_candidates_same_graph():
+    data = get_urls_data(9, 300) + ['a a b', 'b a a', 'x', 'x x']
+    for duplicates_uniqueness in (0.95, 0.8, 0.6, 0.3, 0.05):
+        _, graph = ClusteringService.get_similarity_graph(data, duplicates_uniqueness, candidates='all')
+        _, prefix_graph = ClusteringService.get_similarity_graph(data, duplicates_uniqueness, block_size=64,
+                                                                 candidates='prefix')
+        assert (graph != prefix_graph).nnz == 0
+
+
+def test_seeded_incremental_same_as_batch():
+    data = get_urls_data(13) + get_urls_data(14, 60)
+    for duplicates_uniqueness in (1.0, 0.8, 0.6, 0.3):
+        clustering = IncrementalClustering(duplicates_uniqueness)
+        clustering.seed(data[:180])
+        assert clustering.clusters == ClusteringService.cluster_list(data[:180], duplicates_uniqueness)
+        clustering.add(data[180:])
+        assert clustering.clusters == ClusteringService.cluster_list(data, duplicates_uniqueness)
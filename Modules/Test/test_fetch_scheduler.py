@@ -0,0 +1,44 @@
+import threading
+import time
+
+from Modules.fetch_scheduler import FetchScheduler
+
+
+def make_fetch(requested: list, delay: float = 0.0):
+    def fetch(keys):
+        requested.extend(keys)
+        time.sleep(delay)
+        return [(key, 'https://' + key, '', '') for key in keys]
+    return fetch
+
+
+def test_same_and_fetched_keys_are_requested_once():
+    scheduler = FetchScheduler()
+    requested = []
+    rows = scheduler.fetch(['Ремонт  телефонов', 'ремонт телефонов', 'цена'], make_fetch(requested), 2)
+    assert rows == [('Ремонт  телефонов', 'https://Ремонт  телефонов', '', ''),
+                    ('ремонт телефонов', 'https://Ремонт  телефонов', '', ''),
+                    ('цена', 'https://цена', '', '')]
+
+    rows = scheduler.fetch(['ЦЕНА', 'заказ'], make_fetch(requested), 2)
+    assert [row[1] for row in rows] == ['https://цена', 'https://заказ']
+    assert requested == ['Ремонт  телефонов', 'цена', 'заказ']
+    assert scheduler.stats(2) == {'keys': 5, 'requested': 3, 'saved': 2}
+
+
+def test_in_flight_keys_are_not_requested_again():
+    scheduler = FetchScheduler()
+    requested = []
+    results = {}
+
+    def run(name, keys):
+        results[name] = scheduler.fetch(keys, make_fetch(requested, 0.2))
+
+    first = threading.Thread(target=run, args=('first', ['a', 'b']))
+    first.start()
+    time.sleep(0.05)
+    run('second', ['b', 'c'])
+    first.join()
+
+    assert sorted(requested) == ['a', 'b', 'c']
+    assert results['second'] == [('b', 'https://b', '', ''), ('c', 'https://c', '', '')]
@@ -0,0 +1,36 @@
+import json
+
+import Modules.report_writer as report_writer
+from Modules.report_writer import ReportWriter, iter_report
+
+CLUSTERS = [
+    {'keys': ['ремонт телефонов', 'ремонт "iphone"'], 'urls': [['https://a.by/1', 'https://b.by/'], []]},
+    {'keys': ['цена'], 'urls': [['https://c.by/?q=1,2']], 'score': 12345678901234},
+    {'keys': [], 'urls': []}
+]
+
+
+def test_json_is_compatible_with_json_load(tmp_path):
+    path = str(tmp_path / 'clusters.json')
+    with ReportWriter(path, root='clusters') as writer:
+        writer.write_all(CLUSTERS)
+
+    with open(path, encoding='utf-8') as file:
+        assert json.load(file) == {'clusters': CLUSTERS}
+
+
+def test_iter_report_round_trip(tmp_path, monkeypatch):
+    # Small chunks to cut items and numbers between reads
+    monkeypatch.setattr(report_writer, 'READ_CHUNK_SIZE', 7)
+    for name, root in [('c.json', 'clusters'), ('c.json.gz', None), ('c.ndjson', None), ('c.jsonl.gz', None)]:
+        path = str(tmp_path / name)
+        with ReportWriter(path, root=root) as writer:
+            writer.write_all(CLUSTERS)
+        assert list(iter_report(path, root)) == CLUSTERS
+
+
+def test_empty_report(tmp_path):
+    path = str(tmp_path / 'empty.json')
+    with ReportWriter(path, root='clusters'):
+        pass
+    assert list(iter_report(path, 'clusters')) == []
@@ -0,0 +1,25 @@
+import re
+
+from Modules.word_matcher import WordMatcher
+
+
+def regularity_check(data: str, dictionary: list):
+    data_str = str(data).lower()
+    for word in dictionary:
+        if re.search(r'^' + word.lower() + '[^A-Za-zА-ЯЁа-яё]|[^A-Za-zА-ЯЁа-яё]' + word.lower() +
+                     '[^A-Za-zА-ЯЁа-яё]|[^A-Za-zА-ЯЁа-яё]' + word.lower() + '$', data_str) is not None:
+            return True
+    return False
+
+
+def test_same_as_regex_per_word():
+    dictionary = ['цена', 'каменный горка', 'Минск', 'на час', 'уфа']
+    matcher = WordMatcher(dictionary)
+    for data in ['цена ремонт', 'ремонт цена', 'ремонт цена минск', 'ценами ремонт', 'массаж каменный горка',
+                 'массаж каменный горкай', 'массаж минск', 'мастер на час', 'мастер на часы', 'уфа', 'цена',
+                 'уфа-массаж', 'массаж в уфа!', 'Massage уфа', 'уфаmassage', '']:
+        assert matcher.search(data) == regularity_check(data, dictionary)
+
+
+def test_empty_dictionary():
+    assert WordMatcher([]).search('цена ремонт') is False
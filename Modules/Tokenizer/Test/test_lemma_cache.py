@@ -0,0 +1,43 @@
+import os
+
+from Modules.Tokenizer.tokenizer import Tokenizer
+from Modules.Tokenizer.lemma_cache import LemmaCache, CachedTokenizer
+
+
+class LowerTokenizer(Tokenizer):
+    def __init__(self):
+        self.calls = 0
+
+    def lemma(self, string: str) -> str:
+        self.calls += 1
+        return string.lower()
+
+
+def test_memory_cache():
+    tokenizer = LowerTokenizer()
+    cached = CachedTokenizer(tokenizer, LemmaCache(max_size=2))
+
+    assert cached.lemma('Минск') == 'минск'
+    assert cached.lemma('Минск') == 'минск'
+    assert tokenizer.calls == 1
+
+    cached.lemma('Уфа')
+    cached.lemma('Брест')
+    cached.lemma('Минск')
+    assert tokenizer.calls == 4
+    assert cached.cache.stats()['hits'] == 1
+    assert cached.cache.stats()['misses'] == 4
+    assert cached.cache.stats()['size'] == 2
+
+
+def test_disk_cache(tmp_path):
+    path = os.path.join(str(tmp_path), 'lemmas.sqlite')
+    cache = LemmaCache(path=path)
+    CachedTokenizer(LowerTokenizer(), cache).lemma('Минск')
+    cache.flush()
+
+    tokenizer = LowerTokenizer()
+    cached = CachedTokenizer(tokenizer, LemmaCache(path=path))
+    assert cached.lemma('Минск') == 'минск'
+    assert tokenizer.calls == 0
+    assert cached.cache.stats()['disk_hits'] == 1
@@ -0,0 +1,29 @@
+import pytest
+
+from Modules.Tokenizer import natasha_models
+from Modules.Tokenizer import pymorphy2_tokenizer
+from Modules.Tokenizer.natasha_tokenizer import NatashaTokenizer
+from Modules.Tokenizer.pymorphy2_tokenizer import Pymorphy2Tokenizer
+
+QUERIES = ['Массаж в Минске', 'массаж спины на дому', 'Массаж в Минске', 'купить диван-кровать',
+           'массаж  спины, цена!', '', 'не  болит спина', 'Уфа', 'масло для массажа 100 мл']
+
+
+# Stopwords corpus may be not downloaded, tokenizers get fixed list instead of nltk downloader
+@pytest.fixture
+def stop_words(monkeypatch):
+    words = frozenset(['и', 'в', 'во', 'на', 'не'])
+    monkeypatch.setitem(natasha_models.MODELS, 'stop_words', words)
+    monkeypatch.setattr(pymorphy2_tokenizer, 'STOP_WORDS', words)
+    return words
+
+
+def test_natasha_lemma_batch(stop_words):
+    tokenizer = NatashaTokenizer()
+    assert tokenizer.lemma_batch(QUERIES) == [tokenizer.lemma(query) for query in QUERIES]
+
+
+def test_pymorphy2_lemma_batch(stop_words):
+    tokenizer = Pymorphy2Tokenizer()
+    assert tokenizer.lemma_batch(QUERIES) == [tokenizer.lemma(query) for query in QUERIES]
+    assert tokenizer.lemma('массаж на дому') == 'массаж дом'
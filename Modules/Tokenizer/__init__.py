@@ -1,3 +1,3 @@
 from .tokenizer import Tokenizer
 from .natasha_tokenizer import NatashaTokenizer
-
+from .lemma_cache import LemmaCache, CachedTokenizer
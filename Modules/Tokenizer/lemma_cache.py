@@ -0,0 +1,145 @@
+import atexit
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+
+from Modules.Tokenizer.tokenizer import Tokenizer
+
+LEMMA_CACHE_SIZE = 100000
+# Count of disk writes between commits
+LEMMA_CACHE_COMMIT_EVERY = 500
+
+
+class LemmaCache:
+    def __init__(self, max_size: int = LEMMA_CACHE_SIZE, path: str = None):
+        """
+            :param max_size: max count of lemmas kept in memory (LRU)
+            :param path: path to sqlite file with lemmas kept between runs (None - memory only)
+        """
+        self.max_size = max_size
+        self.path = path
+
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        self.connection = None
+        self.not_committed = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Workers get empty cache with the same settings, sqlite connection can't be pickled
+        return {'max_size': self.max_size, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_size'], state['path'])
+
+    # Return lemma of string made by tokenizer name or None
+    def get(self, name: str, string: str):
+        key = (name, string)
+        with self.lock:
+            lemma = self.memory.get(key)
+            if lemma is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return lemma
+
+            if self.path is not None:
+                row = self.get_connection().execute('SELECT lemma FROM lemmas WHERE tokenizer = ? AND string = ?',
+                                                    key).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._remember(key, row[0])
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    # Save lemma of string made by tokenizer name
+    def put(self, name: str, string: str, lemma: str):
+        key = (name, string)
+        with self.lock:
+            self._remember(key, lemma)
+
+            if self.path is not None:
+                self.get_connection().execute('INSERT OR REPLACE INTO lemmas VALUES (?, ?, ?)', (name, string, lemma))
+                self.not_committed += 1
+                if self.not_committed >= LEMMA_CACHE_COMMIT_EVERY:
+                    self.connection.commit()
+                    self.not_committed = 0
+
+    def _remember(self, key: tuple, lemma: str):
+        self.memory[key] = lemma
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    # Return opened sqlite connection, create table on first use
+    def get_connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute('CREATE TABLE IF NOT EXISTS lemmas (tokenizer TEXT, string TEXT, lemma TEXT, '
+                                    'PRIMARY KEY (tokenizer, string))')
+            atexit.register(self.flush)
+        return self.connection
+
+    # Commit not saved lemmas to disk
+    def flush(self):
+        with self.lock:
+            if self.connection is not None and self.not_committed > 0:
+                self.connection.commit()
+                self.not_committed = 0
+
+    # Return hit/miss counters
+    def stats(self) -> dict:
+        requests = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / requests if requests > 0 else 0.0,
+            'size': len(self.memory)
+        }
+
+
+class CachedTokenizer(Tokenizer):
+    def __init__(self, tokenizer: Tokenizer, cache: LemmaCache = None):
+        """
+            :param tokenizer: tokenizer which lemmas are cached
+            :param cache: cache shared between tokenizers (new memory cache if None)
+        """
+        self.tokenizer = tokenizer
+        self.cache = cache if cache is not None else LemmaCache()
+        self.name = type(tokenizer).__name__
+
+    # Return lemma string
+    def lemma(self, string: str) -> str:
+        lemma = self.cache.get(self.name, string)
+        if lemma is None:
+            lemma = self.tokenizer.lemma(string)
+            self.cache.put(self.name, string, lemma)
+        return lemma
+
+    # Return lemma strings of list of strings, not cached strings are lemmatized by one batch
+    def lemma_batch(self, strings: list) -> list:
+        lemmas = [self.cache.get(self.name, string) for string in strings]
+
+        missed = list(dict.fromkeys(string for string, lemma in zip(strings, lemmas) if lemma is None))
+        if len(missed) > 0:
+            missed_lemmas = dict(zip(missed, self.tokenizer.lemma_batch(missed)))
+            for string, lemma in missed_lemmas.items():
+                self.cache.put(self.name, string, lemma)
+            lemmas = [missed_lemmas[string] if lemma is None else lemma for string, lemma in zip(strings, lemmas)]
+
+        return lemmas
+
+    # Return vectors, tokens of strings
+    def vectorize(self, strings):
+        return self.tokenizer.vectorize(strings)
+
+    # Delegate other tokenizer methods (clear_string etc.)
+    def __getattr__(self, item):
+        if item == 'tokenizer':
+            raise AttributeError(item)
+        return getattr(self.tokenizer, item)
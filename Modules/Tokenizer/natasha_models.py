@@ -0,0 +1,45 @@
+from threading import RLock
+
+from natasha import Segmenter, MorphVocab, NewsEmbedding, NewsMorphTagger, NewsNERTagger
+from nltk.corpus import stopwords
+
+# Models are loaded once per process on first use and shared by all NatashaTokenizer of the process
+MODELS = dict()
+MODELS_LOCK = RLock()
+
+
+# Return model name, load it by loader on first call
+def get_model(name: str, loader):
+    model = MODELS.get(name)
+    if model is None:
+        with MODELS_LOCK:
+            model = MODELS.get(name)
+            if model is None:
+                model = loader()
+                MODELS[name] = model
+    return model
+
+
+def get_embedding() -> NewsEmbedding:
+    return get_model('embedding', NewsEmbedding)
+
+
+def get_segmenter() -> Segmenter:
+    return get_model('segmenter', Segmenter)
+
+
+def get_morph_vocab() -> MorphVocab:
+    return get_model('morph_vocab', MorphVocab)
+
+
+def get_morph_tagger() -> NewsMorphTagger:
+    return get_model('morph_tagger', lambda: NewsMorphTagger(get_embedding()))
+
+
+def get_ner_tagger() -> NewsNERTagger:
+    return get_model('ner_tagger', lambda: NewsNERTagger(get_embedding()))
+
+
+def get_stop_words() -> frozenset:
+    return get_model('stop_words', lambda: frozenset(stopwords.words('russian')))
+
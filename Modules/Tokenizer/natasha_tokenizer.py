@@ -1,31 +1,39 @@
 from Modules.Tokenizer.tokenizer import Tokenizer
-from natasha import Segmenter, MorphVocab, NewsEmbedding, NewsMorphTagger, NewsNERTagger, Doc
+from Modules.Tokenizer import natasha_models
+from natasha import Doc
 from sklearn.feature_extraction.text import CountVectorizer
+from utils.normalize import clear_string, clear_strings
 
-from nltk.corpus import stopwords
 
+# Models are shared by all instances and loaded on first use (see natasha_models)
+class NatashaTokenizer(Tokenizer):
+    @property
+    def natasha_emb(self):
+        return natasha_models.get_embedding()
 
-ALPHABET = ["а", "б", "в", "г", "д", "е", "ё", "ж", "з", "и", "й", "к", "л", "м", "н", "о", " ",
-            "п", "р", "с", "т", "у", "ф", "х", "ц", "ч", "ш", "щ", "ъ", "ы", "ь", "э", "ю", "я",
-            "a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k", "l", "m", "n", "o", "p", "q",
-            "r", "s", "t", "u", "v", "w", "x", "y", "z"]
-ALPHABET = list(map(lambda x: x.upper(), ALPHABET)) + ALPHABET
+    @property
+    def natasha_ner_tagger(self):
+        return natasha_models.get_ner_tagger()
 
+    @property
+    def natasha_segmenter(self):
+        return natasha_models.get_segmenter()
 
-class NatashaTokenizer(Tokenizer):
-    def __init__(self):
-        self.natasha_emb = NewsEmbedding()
-        self.natasha_ner_tagger = NewsNERTagger(self.natasha_emb)
-        self.natasha_segmenter = Segmenter()
-        self.natasha_morph_vocab = MorphVocab()
-        self.natasha_morph_tagger = NewsMorphTagger(self.natasha_emb)
-        self.stop_words = stopwords.words('russian')
+    @property
+    def natasha_morph_vocab(self):
+        return natasha_models.get_morph_vocab()
+
+    @property
+    def natasha_morph_tagger(self):
+        return natasha_models.get_morph_tagger()
+
+    @property
+    def stop_words(self):
+        return natasha_models.get_stop_words()
 
     # Return clear string
     def clear_string(self, string):
-        string = ''.join([letter if letter in ALPHABET else ' ' for letter in string])
-        string = ' '.join([word for word in string.split() if word not in self.stop_words])
-        return string
+        return clear_string(string, self.stop_words)
 
     # Return lemma string
     def lemma(self, string):
@@ -40,6 +48,29 @@ class NatashaTokenizer(Tokenizer):
         lemma = ' '.join([_.lemma for _ in doc.tokens])
         return lemma
 
+    # Return lemma strings of list of strings. Sentences of all strings are tagged by one morph tagger pass.
+    def lemma_batch(self, strings: list) -> list:
+        docs = []
+        for string in clear_strings(strings, self.stop_words):
+            doc = Doc(string)
+            doc.segment(self.natasha_segmenter)
+            docs.append(doc)
+
+        sents = [sent for doc in docs for sent in doc.sents]
+        markups = self.natasha_morph_tagger.map([[_.text for _ in sent.tokens] for sent in sents])
+        for sent, markup in zip(sents, markups):
+            for token, morph_token in zip(sent.tokens, markup.tokens):
+                token.pos = morph_token.pos
+                token.feats = morph_token.feats
+
+        lemmas = []
+        for doc in docs:
+            for token in doc.tokens:
+                token.lemmatize(self.natasha_morph_vocab)
+            lemmas.append(' '.join([_.lemma for _ in doc.tokens]))
+
+        return lemmas
+
     # Return vectors, tokens of strings
     def vectorize(self, strings):
         if len(strings) == 0:
@@ -3,24 +3,27 @@ import pymorphy2
 from Modules.Tokenizer.tokenizer import Tokenizer
 from sklearn.feature_extraction.text import CountVectorizer
 from nltk.corpus import stopwords
+from utils.normalize import clear_string, clear_strings
 
 
-ALPHABET = ["а", "б", "в", "г", "д", "е", "ё", "ж", "з", "и", "й", "к", "л", "м", "н", "о", " ",
-            "п", "р", "с", "т", "у", "ф", "х", "ц", "ч", "ш", "щ", "ъ", "ы", "ь", "э", "ю", "я",
-            "a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k", "l", "m", "n", "o", "p", "q",
-            "r", "s", "t", "u", "v", "w", "x", "y", "z"]
-ALPHABET = list(map(lambda x: x.upper(), ALPHABET)) + ALPHABET
 MORPH = pymorphy2.MorphAnalyzer()
-STOP_WORDS = stopwords.words('russian')
+# Russian stop words of nltk, loaded on first use
+STOP_WORDS = None
+
+
+# Return STOP_WORDS, load them on first call
+def get_stop_words() -> frozenset:
+    global STOP_WORDS
+    if STOP_WORDS is None:
+        STOP_WORDS = frozenset(stopwords.words('russian'))
+    return STOP_WORDS
 
 
 class Pymorphy2Tokenizer(Tokenizer):
     # Return clear string
     @staticmethod
     def clear_string(string):
-        string = ''.join([letter if letter in ALPHABET else ' ' for letter in string])
-        string = ' '.join([word for word in string.split() if word not in STOP_WORDS])
-        return string
+        return clear_string(string, get_stop_words())
 
     # Return lemma string
     def lemma(self, string):
@@ -34,6 +37,18 @@ class Pymorphy2Tokenizer(Tokenizer):
         lemma = ' '.join(lemmed)
         return lemma
 
+    # Return lemma strings of list of strings, every distinct word is parsed once
+    def lemma_batch(self, strings: list) -> list:
+        tokens_list = [string.split(' ') for string in clear_strings(strings, get_stop_words())]
+
+        normal_forms = dict()
+        for tokens in tokens_list:
+            for token in tokens:
+                if token not in normal_forms:
+                    normal_forms[token] = MORPH.parse(token)[0].normal_form
+
+        return [' '.join([normal_forms[token] for token in tokens]) for tokens in tokens_list]
+
     # Return vectors, tokens of strings
     def vectorize(self, strings):
         if len(strings) == 0:
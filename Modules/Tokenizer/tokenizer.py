@@ -4,6 +4,10 @@ class Tokenizer:
     def lemma(self, string: str) -> str:
         pass
 
+    # Return lemma strings of list of strings
+    def lemma_batch(self, strings: list) -> list:
+        return [self.lemma(string) for string in strings]
+
     # Return vectors, tokens of strings
     def vectorize(self, strings):
         pass
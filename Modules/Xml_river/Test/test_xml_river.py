@@ -0,0 +1,129 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from Modules.Xml_river import xml_river
+from Modules.Xml_river.xml_river import XmlRiver
+from Modules.Xml_river.xml_parser import XmlRiverResponseError, parse_report
+from Modules.Xml_river.serp_cache import SerpCache
+
+FIXTURES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures')
+
+REPORT = '<?xml version="1.0" encoding="utf-8"?><yandexsearch version="1.0"><response><results><grouping>' \
+         '<group><doc><url>https://brest.kuku.by/</url><title>Ремонт</title>' \
+         '<passages><passage>Мастер на час</passage></passages></doc></group></grouping></results>' \
+         '</response></yandexsearch>'
+ERROR_REPORT = '<?xml version="1.0" encoding="utf-8"?><yandexsearch version="1.0"><response>' \
+               '<error code="500">Server error</error></response></yandexsearch>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Statuses and reports returned before REPORT
+    failures = []
+
+    def do_GET(self):
+        status, report = self.failures.pop(0) if self.failures else (200, REPORT)
+        body = report.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubXmlRiver(XmlRiver):
+    def __init__(self, port: int):
+        super().__init__({'XMLRiver': {'xml_river_user': 'user', 'xml_river_key': 'key', 'group_by': 10}})
+        self.port = port
+
+    def get_request(self, keys: str) -> str:
+        return 'http://127.0.0.1:{0}/search/xml?query={1}'.format(self.port, keys)
+
+
+@pytest.fixture
+def river(monkeypatch):
+    monkeypatch.setattr(xml_river, 'RETRY_BACKOFF', 0)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield StubXmlRiver(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+    StubHandler.failures.clear()
+
+
+def test_connection_reuse(river):
+    for key in ['ремонт', 'мастер', 'массаж']:
+        result = river.get_query_items_with_params(key)
+        assert result['sites'][0].url == 'https://brest.kuku.by/'
+
+    stats = river.connection_stats()
+    assert stats['requests'] == 3
+    assert stats['connections'] == 1
+    assert stats['reused'] == 2
+
+
+def test_retries(river):
+    StubHandler.failures.extend([(503, ''), (200, ERROR_REPORT)])
+    assert river.get_search_results('ремонт') == REPORT
+    assert river.connection_stats()['requests'] == 3
+
+    StubHandler.failures.extend([(200, ERROR_REPORT)] * 3)
+    with pytest.raises(Exception, match='Server error'):
+        river.get_search_results('ремонт')
+
+
+def test_async_batch(river):
+    keys = ['ремонт {0}'.format(i) for i in range(20)]
+    results = river.get_query_items_batch(keys, concurrency=4)
+    assert len(results) == len(keys)
+    assert all(result['sites'][0].url == 'https://brest.kuku.by/' for result in results)
+
+    StubHandler.failures.extend([(200, ERROR_REPORT)] * 3)
+    with pytest.raises(Exception, match='Stopped in ремонт'):
+        river.get_query_items_batch(['ремонт'], concurrency=1)
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as file:
+        return file.read()
+
+
+def test_parse_report_same_as_soup():
+    report = load_fixture('google_report.xml')
+    soup_result = XmlRiver.parse_query_items_with_params(report)
+    result = parse_report(report)
+
+    assert len(result['sites']) == 10
+    assert [(_.url, _.title, _.description) for _ in result['sites']] == \
+           [(_.url, _.title, _.description) for _ in soup_result['sites']]
+    assert result['relatives'] == soup_result['relatives']
+    assert result['questions'] == soup_result['questions']
+
+
+def test_parse_report_error():
+    with pytest.raises(XmlRiverResponseError, match='Искомая комбинация'):
+        parse_report(load_fixture('error_report.xml'))
+
+
+def test_serp_cache(river, tmp_path):
+    river.cache = SerpCache(os.path.join(str(tmp_path), 'serp.sqlite'))
+    for _ in range(2):
+        assert river.get_query_items_with_params('ремонт')['sites'][0].url == 'https://brest.kuku.by/'
+    assert river.connection_stats()['requests'] == 1
+    assert river.cache.stats() == {'hits': 1, 'misses': 1}
+
+    river.cache.offline = True
+    assert river.get_query_items('ремонт')[0].url == 'https://brest.kuku.by/'
+    with pytest.raises(Exception, match='offline'):
+        river.get_query_items('мастер')
+
+    river.cache.ttl = -1
+    with pytest.raises(Exception, match='offline'):
+        river.get_query_items('ремонт')
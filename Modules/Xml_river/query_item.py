@@ -2,15 +2,22 @@ from bs4 import BeautifulSoup
 
 
 class QueryItem:
-    def __init__(self, doc: BeautifulSoup):
-        self.url = doc.url.text
+    __slots__ = ('url', 'title', 'description')
 
+    def __init__(self, url: str, title: str, description: str):
+        self.url = url
+        self.title = title
+        self.description = description
+
+    # Return QueryItem of doc parsed by BeautifulSoup
+    @classmethod
+    def from_soup(cls, doc: BeautifulSoup):
         title = doc.title.text.replace('![CDATA[', '')
         title = title.replace(']]', '')
         title = title.replace('\xa0', '')
-        self.title = title
 
         description = doc.passages.text.replace('![CDATA[', '')
         description = description.replace(']]', '')
         description = description.replace('\xa0', '')
-        self.description = description
+
+        return cls(doc.url.text, title, description)
@@ -0,0 +1,103 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+
+# Week, results of same request are reused between weekly runs
+SERP_CACHE_TTL = 7 * 24 * 60 * 60
+SERP_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+# Count of writes between size checks
+SERP_CACHE_EVICT_EVERY = 100
+
+
+class SerpCache:
+    def __init__(self, path: str, ttl: float = SERP_CACHE_TTL, max_size: int = SERP_CACHE_MAX_SIZE,
+                 offline: bool = False):
+        """
+            Compressed sqlite store of XMLRiver reports
+            :param path: path to sqlite file
+            :param ttl: seconds while stored report is valid (None - forever)
+            :param max_size: max size of compressed reports in bytes, least recently used are evicted
+            :param offline: serve only from cache, miss raises exception
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+
+        self.connection = None
+        self.connection_pid = None
+        self.not_evicted = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['connection'] = None
+        state['connection_pid'] = None
+        return state
+
+    # Return key of request made by river class with params
+    @staticmethod
+    def make_key(*params) -> str:
+        return hashlib.sha256('\n'.join(str(_) for _ in params).encode('utf-8')).hexdigest()
+
+    # Return opened sqlite connection of current process
+    def get_connection(self) -> sqlite3.Connection:
+        if self.connection is None or self.connection_pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS reports (key TEXT PRIMARY KEY, report BLOB, '
+                                    'size INTEGER, created REAL, accessed REAL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS reports_accessed ON reports (accessed)')
+            self.connection_pid = os.getpid()
+        return self.connection
+
+    # Return stored report of key or None
+    def get(self, key: str):
+        connection = self.get_connection()
+        row = connection.execute('SELECT report, created FROM reports WHERE key = ?', (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            self.misses += 1
+            return None
+
+        connection.execute('UPDATE reports SET accessed = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    # Save report of key
+    def put(self, key: str, report: str):
+        data = zlib.compress(report.encode('utf-8'))
+        now = time.time()
+        self.get_connection().execute('INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?)',
+                                      (key, data, len(data), now, now))
+
+        self.not_evicted += 1
+        if self.not_evicted >= SERP_CACHE_EVICT_EVERY:
+            self.evict()
+
+    # Delete expired reports and least recently used reports over max_size
+    def evict(self):
+        connection = self.get_connection()
+        self.not_evicted = 0
+        if self.ttl is not None:
+            connection.execute('DELETE FROM reports WHERE created < ?', (time.time() - self.ttl,))
+
+        size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM reports').fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        deleted = []
+        for key, report_size in connection.execute('SELECT key, size FROM reports ORDER BY accessed').fetchall():
+            if size <= self.max_size:
+                break
+            deleted.append((key,))
+            size -= report_size
+        connection.executemany('DELETE FROM reports WHERE key = ?', deleted)
+
+    # Return hit/miss counters
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
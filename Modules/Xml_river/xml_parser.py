@@ -0,0 +1,101 @@
+from io import BytesIO
+
+from lxml import etree
+
+from .query_item import QueryItem
+
+
+class XmlRiverResponseError(Exception):
+    pass
+
+
+# Return lowercase tag name of element without namespace
+def local_tag(element) -> str:
+    if not isinstance(element.tag, str):
+        return ''
+    return etree.QName(element).localname.lower()
+
+
+# Return text of element with all children
+def element_text(element) -> str:
+    return ''.join(element.itertext()).replace('\xa0', '')
+
+
+# Return query data of XMLRiver report made by one iterparse pass.
+# Raise XmlRiverResponseError if report contains response error.
+def parse_report(report: str, relatives: bool = True, questions: bool = True) -> dict:
+    query_items = []
+    relatives_list = []
+    questions_list = []
+    has_response = False
+
+    path = []
+    try:
+        for event, element in etree.iterparse(BytesIO(report.encode('utf-8')), events=('start', 'end'),
+                                              recover=True):
+            tag = local_tag(element)
+            if event == 'start':
+                path.append(tag)
+                continue
+
+            path.pop()
+            if tag == 'response':
+                has_response = True
+            elif tag == 'error' and 'response' in path:
+                raise XmlRiverResponseError(str(element.text))
+            elif tag == 'doc':
+                fields = {local_tag(child): child for child in element}
+                query_items.append(QueryItem(
+                    element_text(fields['url']) if 'url' in fields else '',
+                    element_text(fields['title']) if 'title' in fields else '',
+                    element_text(fields['passages']) if 'passages' in fields else ''
+                ))
+                element.clear()
+            elif tag == 'title' and 'doc' not in path:
+                if relatives and 'relatedsearches' in path:
+                    relatives_list.append(element_text(element))
+                elif questions and 'relatedquestions' in path:
+                    questions_list.append(element_text(element).split('?')[0])
+    except XmlRiverResponseError:
+        raise
+    except Exception:
+        raise Exception('XmlRiver can\'t parse report: ' + report)
+
+    if not has_response:
+        raise Exception('XmlRiver can\'t parse report: ' + report)
+
+    result = {'sites': query_items}
+    if relatives:
+        result['relatives'] = relatives_list
+    if questions:
+        result['questions'] = questions_list
+
+    return result
+
+
+# Return text of XMLRiver response error in report or None
+def get_report_error(report: str):
+    has_response = False
+    path = []
+    try:
+        for event, element in etree.iterparse(BytesIO(report.encode('utf-8')), events=('start', 'end'),
+                                              recover=True):
+            tag = local_tag(element)
+            if event == 'start':
+                path.append(tag)
+                continue
+
+            path.pop()
+            if tag == 'response':
+                has_response = True
+            elif tag == 'error' and 'response' in path:
+                return str(element.text)
+            elif tag == 'doc':
+                element.clear()
+    except Exception:
+        raise Exception('XmlRiver can\'t parse report: ' + report)
+
+    if not has_response:
+        raise Exception('XmlRiver can\'t parse report: ' + report)
+
+    return None
@@ -1,36 +1,174 @@
+import os
+import time
+import asyncio
+from functools import partial
+from urllib.parse import urlsplit, parse_qsl
+
+import aiohttp
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .query_item import QueryItem
+from .xml_parser import XmlRiverResponseError, parse_report, get_report_error
+from .serp_cache import SerpCache
 # from Modules.Logger.logger import get_logger
 #
 # logger = get_logger(__name__)
 
+# Connections kept alive per host, should be >= count of threads using one river
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 60
+# Attempts for XMLRiver response errors and HTTP retries for connection errors and 429/5xx
+REQUEST_RETRIES = 3
+# Sleep before retry is RETRY_BACKOFF * 2 ** (attempt - 1) seconds
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Requests in flight of async client
+ASYNC_CONCURRENCY = 200
+# Request params not changing search results, they are not part of cache key
+NOT_CACHED_PARAMS = ('user', 'key')
+
 
 class XmlRiver:
     def __init__(self, config):
         self.xml_river_user = config['XMLRiver']['xml_river_user']
         self.xml_river_key = config['XMLRiver']['xml_river_key']
         self.group_by = config['XMLRiver']['group_by']
+        self.pool_size = config['XMLRiver'].get('pool_size', POOL_SIZE)
+
+        # Optional dict with SerpCache params: path, ttl, max_size, offline
+        cache_config = config['XMLRiver'].get('cache')
+        self.cache = SerpCache(**cache_config) if cache_config else None
+
+        self.session = None
+        self.session_pid = None
+
+    def __getstate__(self):
+        # Every process opens its own session, sockets can't be pickled
+        state = self.__dict__.copy()
+        state['session'] = None
+        state['session_pid'] = None
+        return state
+
+    # Return keep-alive session of current process with pooled connections and retry policy
+    def get_session(self) -> requests.Session:
+        if self.session is None or self.session_pid != os.getpid():
+            retry = Retry(total=REQUEST_RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES,
+                          allowed_methods=frozenset(['GET']), raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+
+            self.session = requests.Session()
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.session_pid = os.getpid()
+
+        return self.session
+
+    # Return count of made requests and opened connections of current process session
+    def connection_stats(self) -> dict:
+        requests_count = 0
+        connections = 0
+        if self.session is not None and self.session_pid == os.getpid():
+            for adapter in set(self.session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    requests_count += pools[key].num_requests
+                    connections += pools[key].num_connections
+
+        return {
+            'requests': requests_count,
+            'connections': connections,
+            'reused': requests_count - connections
+        }
+
+    # Request search results from XMLRiver. Return report or report parsed by parse.
+    # parse must raise XmlRiverResponseError on response error to retry request.
+    def get_search_results(self, keys: str, parse=None):
+        cache_key, result = self.get_cached_results(keys, parse)
+        if result is not None:
+            return result
+
+        error = None
+        for i in range(REQUEST_RETRIES):
+            if i > 0:
+                time.sleep(RETRY_BACKOFF * 2 ** (i - 1))
 
-    # Request search results from XMLRiver
-    def get_search_results(self, keys: str) -> str:
-        errors = ''
-        report = ''
-        for i in range(3):
             # logger.info('XMLRiver request: ' + keys)
-            report = requests.get(self.get_request(keys), timeout=60).text
-            errors = BeautifulSoup(report, 'lxml')
-            if errors.yandexsearch.response.error is not None:
-                pass
-                # logger.warn('XMLRiver response error: ' + str(errors.yandexsearch.response.error.string) +
-                #             ' try make request again.')
-            else:
-                break
+            report = self.get_session().get(self.get_request(keys), timeout=REQUEST_TIMEOUT).text
+            try:
+                return self.accept_report(cache_key, report, parse)
+            except XmlRiverResponseError as e:
+                error = e
+                # logger.warn('XMLRiver response error: ' + str(e) + ' try make request again.')
+
+        raise Exception('XmlRiver response error: ' + str(error))
+
+    # Request search results from XMLRiver by aiohttp session
+    async def get_search_results_async(self, session: aiohttp.ClientSession, keys: str,
+                                       timeout: float = REQUEST_TIMEOUT, parse=None):
+        cache_key, result = self.get_cached_results(keys, parse)
+        if result is not None:
+            return result
+
+        error = None
+        for i in range(REQUEST_RETRIES):
+            if i > 0:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (i - 1))
+
+            try:
+                async with session.get(self.get_request(keys), timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    report = await response.text()
+                    if response.status in RETRY_STATUSES:
+                        error = 'HTTP ' + str(response.status)
+                        continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+                continue
+
+            try:
+                return self.accept_report(cache_key, report, parse)
+            except XmlRiverResponseError as e:
+                error = e
+
+        raise Exception('XmlRiver response error: ' + str(error))
+
+    # Return cache key of keys and cached report parsed by parse (None if not cached)
+    def get_cached_results(self, keys: str, parse=None) -> (str, object):
+        if self.cache is None:
+            return None, None
+
+        cache_key = self.get_cache_key(keys)
+        report = self.cache.get(cache_key)
+        if report is not None:
+            return cache_key, self.check_report(report) if parse is None else parse(report)
 
-        if errors.yandexsearch.response.error is not None:
-            raise Exception('XmlRiver response error: ' + str(errors.yandexsearch.response.error.string))
+        if self.cache.offline:
+            raise Exception('XmlRiver offline mode, no cached report for: ' + keys)
 
+        return cache_key, None
+
+    # Return report parsed by parse and save it to cache
+    def accept_report(self, cache_key: str, report: str, parse=None):
+        result = self.check_report(report) if parse is None else parse(report)
+        if cache_key is not None:
+            self.cache.put(cache_key, report)
+        return result
+
+    # Return cache key of request with keys: river class and request params without credentials
+    def get_cache_key(self, keys: str) -> str:
+        request = urlsplit(self.get_request(keys))
+        params = sorted((name, value) for name, value in parse_qsl(request.query, keep_blank_values=True)
+                        if name not in NOT_CACHED_PARAMS)
+        return SerpCache.make_key(type(self).__name__, request.path, params)
+
+    # Return report, raise XmlRiverResponseError if it contains response error
+    @staticmethod
+    def check_report(report: str) -> str:
+        error = get_report_error(report)
+        if error is not None:
+            raise XmlRiverResponseError(error)
         return report
 
     # Set locale for search
@@ -43,32 +181,61 @@ class XmlRiver:
 
     # Get query data from keys
     def get_query_items(self, keys: str) -> list:
-        try:
-            xml_report = self.get_search_results(keys)
-        except Exception as e:
-            raise e
+        return self.get_query_items_with_params(keys, relatives=False, questions=False)['sites']
 
-        try:
-            soup = BeautifulSoup(xml_report, "html.parser")
-            docs = soup.findAll('doc')
+    # Get query data from keys
+    def get_query_items_with_params(self, key: str, relatives: bool = True, questions: bool = True) -> dict:
+        return self.get_search_results(key, partial(parse_report, relatives=relatives, questions=questions))
 
-            query_items = []
-            for doc in docs:
-                query_items.append(QueryItem(doc))
+    # Get query data from key by aiohttp session
+    async def get_query_items_with_params_async(self, session: aiohttp.ClientSession, key: str,
+                                                relatives: bool = True, questions: bool = True,
+                                                timeout: float = REQUEST_TIMEOUT) -> dict:
+        return await self.get_search_results_async(session, key, timeout,
+                                                   partial(parse_report, relatives=relatives, questions=questions))
 
-        except Exception as e:
-            query_items = []
-            raise Exception('XmlRiver can\'t parse report: ' + xml_report)
+    # Yield (index, key, query data) of keys as soon as they are ready, at most concurrency requests in flight
+    async def iter_query_items_async(self, keys: list, concurrency: int = ASYNC_CONCURRENCY,
+                                     timeout: float = REQUEST_TIMEOUT, relatives: bool = True,
+                                     questions: bool = True):
+        semaphore = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
 
-        return query_items
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def query(index: int, key: str):
+                async with semaphore:
+                    try:
+                        result = await self.get_query_items_with_params_async(session, key, relatives, questions,
+                                                                              timeout)
+                    except Exception as e:
+                        raise Exception('Stopped in ' + key + ' error: ' + str(e))
+                    return index, key, result
 
-    # Get query data from keys
-    def get_query_items_with_params(self, key: str, relatives: bool = True, questions: bool = True) -> (list, list):
-        try:
-            xml_report = self.get_search_results(key)
-        except Exception as e:
-            raise e
+            tasks = [asyncio.ensure_future(query(index, key)) for index, key in enumerate(keys)]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    yield await task
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Return query data of keys in order of keys, requests are made by async client
+    def get_query_items_batch(self, keys: list, concurrency: int = ASYNC_CONCURRENCY,
+                              timeout: float = REQUEST_TIMEOUT, relatives: bool = True,
+                              questions: bool = True) -> list:
+        async def collect():
+            results = [None] * len(keys)
+            async for index, _, result in self.iter_query_items_async(keys, concurrency, timeout,
+                                                                      relatives, questions):
+                results[index] = result
+            return results
+
+        return asyncio.run(collect())
 
+    # Return query data from XMLRiver report parsed by BeautifulSoup (slower than xml_parser.parse_report)
+    @staticmethod
+    def parse_query_items_with_params(xml_report: str, relatives: bool = True, questions: bool = True) -> dict:
         try:
             soup = BeautifulSoup(xml_report, "html.parser")
             docs = soup.findAll('doc')
@@ -76,7 +243,7 @@ class XmlRiver:
 
             query_items = []
             for doc in docs:
-                query_items.append(QueryItem(doc))
+                query_items.append(QueryItem.from_soup(doc))
             result['sites'] = query_items
 
             if relatives:
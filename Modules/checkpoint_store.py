@@ -0,0 +1,75 @@
+import os
+import json
+import sqlite3
+
+
+class CheckpointStore:
+    def __init__(self, path: str):
+        """
+            Sqlite store of run progress: state snapshots of finished stages and SERP rows of requested keys
+            :param path: path to sqlite file
+        """
+        self.path = path
+
+        self.connection = None
+        self.connection_pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['connection'] = None
+        state['connection_pid'] = None
+        return state
+
+    # Return opened sqlite connection of current process
+    def get_connection(self) -> sqlite3.Connection:
+        if self.connection is None or self.connection_pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS stages (step INTEGER PRIMARY KEY, state TEXT)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row TEXT)')
+            self.connection_pid = os.getpid()
+        return self.connection
+
+    # Save state dict of finished step
+    def save_stage(self, step: int, state: dict):
+        self.get_connection().execute('INSERT OR REPLACE INTO stages VALUES (?, ?)',
+                                      (step, json.dumps(state, ensure_ascii=False)))
+
+    # Return (step, state) of last finished step or None
+    def load_last_stage(self):
+        row = self.get_connection().execute('SELECT step, state FROM stages ORDER BY step DESC LIMIT 1').fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    # Save query row of key
+    def put_row(self, key: str, row: tuple):
+        self.get_connection().execute('INSERT OR REPLACE INTO rows VALUES (?, ?)',
+                                      (key, json.dumps(row, ensure_ascii=False)))
+
+    # Return dict key -> saved query row of keys
+    def get_rows(self, keys: list) -> dict:
+        connection = self.get_connection()
+        rows = dict()
+        keys = list(dict.fromkeys(keys))
+        # Sqlite limit of query params
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for key, row in connection.execute('SELECT key, row FROM rows WHERE key IN ({0})'.format(
+                    ', '.join('?' * len(chunk))), chunk):
+                rows[key] = tuple(json.loads(row))
+        return rows
+
+    # Delete all saved progress
+    def clear(self):
+        connection = self.get_connection()
+        connection.execute('DELETE FROM stages')
+        connection.execute('DELETE FROM rows')
+
+    # Return counts of saved steps and rows
+    def stats(self) -> dict:
+        connection = self.get_connection()
+        return {
+            'stages': connection.execute('SELECT COUNT(*) FROM stages').fetchone()[0],
+            'rows': connection.execute('SELECT COUNT(*) FROM rows').fetchone()[0]
+        }
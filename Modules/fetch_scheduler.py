@@ -0,0 +1,85 @@
+from threading import Lock
+from concurrent.futures import Future
+
+
+class FetchScheduler:
+    def __init__(self):
+        """
+            Front of paid requests: keys are normalized, every normalized key is requested once per run.
+            Same keys of one batch and keys requested by other threads at the moment (in flight) wait
+            for one request, keys requested earlier are served from memo
+        """
+        self.lock = Lock()
+        # Normalized key -> row
+        self.memo = dict()
+        # Normalized key -> Future of row requested by other batch
+        self.in_flight = dict()
+        # Stage -> counters
+        self.stages = dict()
+
+    def __getstate__(self):
+        # Workers get empty scheduler, lock can't be pickled
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    # Return key normalized for search: lower case, single spaces
+    @staticmethod
+    def normalize(key: str) -> str:
+        return ' '.join(str(key).lower().split())
+
+    # Return rows of keys in order of keys, row[0] is the key. fetch(keys) -> rows in order of keys is called once
+    # for keys which normalized form was not requested before
+    def fetch(self, keys: list, fetch, stage=None) -> list:
+        normalized = [self.normalize(key) for key in keys]
+        # Normalized key -> first key with it, the one really requested
+        first = dict()
+        for key, normalized_key in zip(keys, normalized):
+            first.setdefault(normalized_key, key)
+
+        owned = list()
+        waited = dict()
+        with self.lock:
+            for key in first:
+                if key in self.memo:
+                    continue
+                if key in self.in_flight:
+                    waited[key] = self.in_flight[key]
+                else:
+                    self.in_flight[key] = Future()
+                    owned.append(key)
+
+        try:
+            rows = fetch([first[key] for key in owned]) if len(owned) > 0 else []
+        except Exception as error:
+            with self.lock:
+                for key in owned:
+                    self.in_flight.pop(key).set_exception(error)
+            raise
+
+        with self.lock:
+            for key, row in zip(owned, rows):
+                self.memo[key] = row
+                self.in_flight.pop(key).set_result(row)
+
+        for key, future in waited.items():
+            future.result()
+
+        with self.lock:
+            counters = self.stages.setdefault(stage, {'keys': 0, 'requested': 0, 'saved': 0})
+            counters['keys'] += len(keys)
+            counters['requested'] += len(owned)
+            counters['saved'] += len(keys) - len(owned)
+            return [(key,) + tuple(self.memo[normalized_key][1:]) for key, normalized_key in zip(keys, normalized)]
+
+    # Return counters of stage: keys - asked keys, requested - keys really requested, saved - not requested
+    def stats(self, stage=None) -> dict:
+        with self.lock:
+            return dict(self.stages.get(stage, {'keys': 0, 'requested': 0, 'saved': 0}))
+
+    # Forget fetched rows and counters
+    def clear(self):
+        with self.lock:
+            self.memo.clear()
+            self.stages.clear()
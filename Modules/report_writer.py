@@ -0,0 +1,184 @@
+import io
+import gzip
+import json
+
+# Chars read from report at once by loader
+READ_CHUNK_SIZE = 64 * 1024
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+
+# Return (format, compression) by file name: report.ndjson.gz -> ('ndjson', 'gzip')
+def detect_format(path: str) -> tuple:
+    name = path.lower()
+    compression = None
+    if name.endswith('.gz'):
+        compression = 'gzip'
+        name = name[:-len('.gz')]
+    elif name.endswith('.zst'):
+        compression = 'zstd'
+        name = name[:-len('.zst')]
+
+    fmt = 'ndjson' if name.endswith(NDJSON_EXTENSIONS) else 'json'
+    return fmt, compression
+
+
+# Return text stream of file with compression (None, 'gzip' or 'zstd'), mode is 'r' or 'w'
+def open_report(path: str, mode: str, compression: str = None):
+    if compression is None:
+        return open(path, mode, encoding='utf-8', newline='\n')
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='\n')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception('zstandard package is required for .zst reports')
+        return zstandard.open(path, mode + 't', encoding='utf-8', newline='\n')
+    raise Exception('Unknown compression: ' + str(compression))
+
+
+class ReportWriter:
+    def __init__(self, path: str, root: str = None, fmt: str = None, compression: str = None):
+        """
+            Writer of report items one by one, items are not kept in memory.
+            Use as context manager: with ReportWriter('clusters.ndjson.gz') as writer: writer.write(item)
+            :param path: output file
+            :param root: json format only - name of key of the object holding items array (None - bare array)
+            :param fmt: 'ndjson' (item per line) or 'json' (array), detected by file name if None
+            :param compression: None, 'gzip' or 'zstd', detected by file name if fmt is None
+        """
+        self.path = path
+        self.root = root
+        if fmt is None:
+            fmt, compression = detect_format(path)
+        if fmt not in ('ndjson', 'json'):
+            raise Exception('Unknown report format: ' + str(fmt))
+        self.fmt = fmt
+        self.compression = compression
+
+        self.stream = None
+        self.count = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self):
+        self.stream = open_report(self.path, 'w', self.compression)
+        if self.fmt == 'json':
+            self.stream.write('[' if self.root is None else '{' + json.dumps(self.root) + ': [')
+        self.count = 0
+
+    # Write one item
+    def write(self, item):
+        if self.fmt == 'ndjson':
+            self.stream.write(json.dumps(item, ensure_ascii=False))
+            self.stream.write('\n')
+        else:
+            if self.count > 0:
+                self.stream.write(',')
+            self.stream.write('\n')
+            self.stream.write(json.dumps(item, ensure_ascii=False))
+        self.count += 1
+
+    # Write all items of iterable
+    def write_all(self, items):
+        for item in items:
+            self.write(item)
+
+    def close(self):
+        if self.stream is None:
+            return
+        if self.fmt == 'json':
+            self.stream.write('\n]' if self.root is None else '\n]}')
+        self.stream.close()
+        self.stream = None
+
+
+# Yield items of report lazily, format and compression are detected by file name.
+# Json report may be bare array or object with array in root key (first array is read if root is None)
+def iter_report(path: str, root: str = None):
+    fmt, compression = detect_format(path)
+    with open_report(path, 'r', compression) as stream:
+        if fmt == 'ndjson':
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(stream, root)
+
+
+# Return items of first json array after root key, decoded by chunks
+def _iter_json_array(stream: io.TextIOBase, root: str = None):
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    # Read next chunk, return false on end of file
+    def read_more():
+        nonlocal buf, pos, eof
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    # Move pos to next not space char, return it or None on end of file
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not read_more():
+                return None
+
+    # Skip to array start
+    marker = '[' if root is None else json.dumps(root)
+    while True:
+        start = buf.find(marker, pos)
+        if start >= 0:
+            pos = start + len(marker)
+            break
+        pos = max(pos, len(buf) - len(marker))
+        if not read_more():
+            raise Exception('Report has no items array')
+    if root is not None:
+        if next_char() != ':':
+            raise Exception('Report root is not an array: ' + root)
+        pos += 1
+        if next_char() != '[':
+            raise Exception('Report root is not an array: ' + root)
+        pos += 1
+
+    if next_char() == ']':
+        return
+    while True:
+        while True:
+            next_char()
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof or not read_more():
+                    raise Exception('Report is truncated')
+                continue
+            # Number at the end of buffer may be cut
+            if end == len(buf) and not eof and read_more():
+                continue
+            break
+        pos = end
+        yield item
+
+        char = next_char()
+        if char == ']':
+            return
+        if char != ',':
+            raise Exception('Report is broken at item ' + str(item))
+        pos += 1
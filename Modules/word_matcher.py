@@ -0,0 +1,26 @@
+import re
+
+NOT_LETTER = '[^A-Za-zА-ЯЁа-яё]'
+
+
+class WordMatcher:
+    def __init__(self, dictionary):
+        """
+            Matcher of "direct" including of dictionary words in strings, compiled once for the dictionary.
+            Word must be bounded by not letters from both sides or by start/end of string from one side,
+            so string that is exactly the word is not matched.
+            :param dictionary: iterable of words
+        """
+        self.words = frozenset(str(word).lower() for word in dictionary)
+
+        if len(self.words) == 0:
+            self.pattern = None
+        else:
+            words = '|'.join(re.escape(word) for word in sorted(self.words, key=len, reverse=True))
+            self.pattern = re.compile('^(?:{0}){1}|{1}(?:{0}){1}|{1}(?:{0})$'.format(words, NOT_LETTER))
+
+    # Return true if one of words is included in data
+    def search(self, data: str) -> bool:
+        if self.pattern is None:
+            return False
+        return self.pattern.search(str(data).lower()) is not None
@@ -1,16 +1,24 @@
 import json
-import re
 import copy
+import asyncio
+from functools import partial
 
 from tqdm import tqdm
 from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing_logging import install_mp_handler
 
 from Modules.Xml_river import YandexXmlRiver, GoogleXmlRiver
-from Modules.GoogleApi import GoogleSearchConsoleApi, GoogleSheetsApi
-from Modules.сlusterer_service import ClusteringService
+from Modules.GoogleApi import GoogleSearchConsoleApi, GoogleSheetsApi, SheetsReportBuilder
+from Modules.сlusterer_service import ClusteringService, IncrementalClustering
 from Modules.GeoFiches.geo_fiches import GeoFiches
+from Modules.GeoFiches.gazetteer import Gazetteer
 from Modules.Tokenizer.natasha_tokenizer import NatashaTokenizer
+from Modules.Tokenizer.lemma_cache import LemmaCache, CachedTokenizer
+from Modules.word_matcher import WordMatcher
+from Modules.report_writer import ReportWriter
+from Modules.checkpoint_store import CheckpointStore
+from Modules.fetch_scheduler import FetchScheduler
 
 # from Modules.Logger.logger import get_logger
 
@@ -19,16 +27,43 @@ from Modules.Tokenizer.natasha_tokenizer import NatashaTokenizer
 
 NUM_THREADS = 8
 COUNT_OF_EXTRA_REQUESTS = 3
+# Requests in flight in async mode
+ASYNC_CONCURRENCY = 200
+# Urls requested from Search Console at the same time
+GSC_THREADS = 8
 
 
+# Return query row of key requested by river. Pool workers get only river, not the whole service.
+# Requests are retried by river
+def query_worker(river, key: str) -> (str, str, str, str):
+    try:
+        result = river.get_query_items_with_params(key)
+    except Exception as e:
+        raise Exception('Stopped in ' + key + ' error: ' + str(e))
+    return ClustererSearchKeysService.query_row(key, result)
+
 class ClustererSearchKeysService:
-    def __init__(self, google_token: str, search_engine: str, xml_river_config: dict):
+    def __init__(self, google_token: str, search_engine: str, xml_river_config: dict, lemma_cache_path: str = None,
+                 checkpoint_path: str = None):
         """
             :param google_token: token for google table
             :param search_engine: type of search engine (YANDEX/GOOGLE)
             :param xml_river_config: xml_river_config dict
+            :param lemma_cache_path: path to sqlite file with lemmas kept between runs (None - memory only)
+            :param checkpoint_path: path to sqlite file with progress of get_stats (None - not saved)
         """
         self.google_token = google_token
+        self.lemma_cache = LemmaCache(path=lemma_cache_path)
+
+        self.checkpoint = CheckpointStore(checkpoint_path) if checkpoint_path is not None else None
+        # Continue get_stats from last saved stage of checkpoint, otherwise saved progress is cleared
+        self.resume = False
+
+        # Make XMLRiver requests by asyncio client in this process instead of pool of NUM_THREADS processes
+        self.async_mode = False
+        self.async_concurrency = ASYNC_CONCURRENCY
+        # Get gsc queries of all urls of domain by one site-wide request grouped by page and query
+        self.gsc_site_wide = False
 
         if search_engine == 'GOOGLE':
             self.river = GoogleXmlRiver(xml_river_config)
@@ -45,16 +80,29 @@ class ClustererSearchKeysService:
         self.stop_words = list()
         self.old_anchors = list()
 
+        self.matchers = dict()
+        # Every normalized key is requested from XMLRiver once per run
+        self.scheduler = FetchScheduler()
+        # Similarity -> IncrementalClustering of self.results
+        self.clusterings = dict()
+
         self.deleted = list()
         self.made_queries = list()
         self.results_queries = list()
         self.results = list()
         self.geo_queries = list()
+        # Query -> lemmas of its words, query -> lemma of query without geo (geo queries), made in sort_queries
+        self.word_lemmas = dict()
+        self.geo_free_lemmas = dict()
+
+    # Return GeoFiches with lemmas cached in self.lemma_cache
+    def get_geo_fiches(self) -> GeoFiches:
+        return GeoFiches(CachedTokenizer(NatashaTokenizer(), self.lemma_cache))
 
     # Set containers to clustering
     def set_containers(self, containers: list):
         self.clear()
-        geo_fiches = GeoFiches(NatashaTokenizer())
+        geo_fiches = self.get_geo_fiches()
         for container in containers:
             self.urls.append([container.domain, container.path])
             if container.extract_city is not None:
@@ -73,39 +121,59 @@ class ClustererSearchKeysService:
         self.old_anchors = self.del_duplicates(self.old_anchors)
 
     def set_inclusion_words(self, inclusion_words: list):
-        geo_fiches = GeoFiches(NatashaTokenizer())
+        geo_fiches = self.get_geo_fiches()
         for inclusion_word in inclusion_words:
             self.inclusion_words.append(geo_fiches.lemma_of_query(inclusion_word))
 
     def set_stop_words(self, stop_words: list):
-        geo_fiches = GeoFiches(NatashaTokenizer())
+        geo_fiches = self.get_geo_fiches()
         for stop_word in stop_words:
             self.stop_words.append(geo_fiches.lemma_of_query(stop_word))
 
     # Return list with gsc keys
-    def get_gsc_queries(self, url) -> list:
+    def get_gsc_queries(self, url, gsc_service: GoogleSearchConsoleApi = None) -> list:
+        if gsc_service is None:
+            gsc_service = self.get_gsc_service()
+
+        return self.retry_gsc_request(lambda: gsc_service.get_keys_by_url(url[0], url[1]), url[0]+url[1])
+
+    # Return lists with gsc keys of every url, requested by one authorized client in GSC_THREADS threads
+    def get_gsc_queries_bulk(self, urls: list) -> list:
+        gsc_service = self.get_gsc_service()
+
+        if self.gsc_site_wide:
+            domains = list(dict.fromkeys(url[0] for url in urls))
+            with ThreadPoolExecutor(GSC_THREADS) as executor:
+                pages = dict(zip(domains, tqdm(executor.map(
+                    lambda domain: self.retry_gsc_request(lambda: gsc_service.get_keys_by_site(domain), domain,
+                                                          dict()), domains), total=len(domains))))
+            return [pages[url[0]].get(url[0] + url[1], []) for url in urls]
+
+        with ThreadPoolExecutor(GSC_THREADS) as executor:
+            return list(tqdm(executor.map(lambda url: self.get_gsc_queries(url, gsc_service), urls),
+                             total=len(urls)))
+
+    # Return authorized Search Console client
+    def get_gsc_service(self) -> GoogleSearchConsoleApi:
         try:
-            gsc_service = GoogleSearchConsoleApi(self.google_token)
+            return GoogleSearchConsoleApi(self.google_token)
         except Exception as error:
             raise Exception('Stopped in authorisation error: ' + str(error))
 
-        result = []
+    # Return result of request made with 3 tries, default ([] if None) if all of them failed
+    @staticmethod
+    def retry_gsc_request(request, name: str, default=None):
         error = None
         for i in range(3):
             try:
-                result = gsc_service.get_keys_by_url(url[0], url[1])
-                error = None
-                break
+                return request()
             except Exception as e:
-                # logger.info("Can't download gsc queries for {0}. Error: {1}. Try again.".format(url[0]+url[1], error))
+                # logger.info("Can't download gsc queries for {0}. Error: {1}. Try again.".format(name, e))
                 error = e
 
-        if error is not None:
-            result = []
-            # logger.warn("Can't download gsc queries for {0}. Error: {1}. Ignore url".format(url[0]+url[1], error))
-            print('Error in ' + url[0]+url[1] + ' error: ' + str(error))
-
-        return result
+        # logger.warn("Can't download gsc queries for {0}. Error: {1}. Ignore url".format(name, error))
+        print('Error in ' + name + ' error: ' + str(error))
+        return [] if default is None else default
 
     # Filter queries del (delete duplicates and not valid queries)
     def filter_gsc_queries(self, queries: list, min_clicks: int = 1, min_impressions: int = 50) -> list:
@@ -113,13 +181,13 @@ class ClustererSearchKeysService:
         clusters = ClusteringService().cluster_list(queries_text, 1)
 
         result = list()
-        added_clusters = list()
+        added_clusters = set()
         to_delete = list()
         for i, cluster in enumerate(clusters):
             if cluster not in added_clusters:
                 if queries[i][1] >= min_clicks or queries[i][2] >= min_impressions:
                     result.append(queries[i])
-                    added_clusters.append(cluster)
+                    added_clusters.add(cluster)
                 else:
                     to_delete.append(queries[i][0])
 
@@ -132,18 +200,20 @@ class ClustererSearchKeysService:
 
     # Sort queries by geo and main
     def sort_queries(self, queries: list, stage: int) -> (list, list):
-        geo_fiches = GeoFiches(NatashaTokenizer())
+        geo_fiches = self.get_geo_fiches()
         geo_queries = []
         main_queries = []
         to_delete = []
-        for query in queries:
-            lemma = geo_fiches.lemma_of_query(query[0])
-            if not self.regularity_check(lemma, self.stop_words):
-                if self.regularity_check(lemma, list(self.clear_geo)):
+        lemmas = geo_fiches.lemma_of_queries([query[0] for query in queries])
+        stop_words = self.get_matcher('stop_words', self.stop_words)
+        clear_geo = self.get_matcher('clear_geo', self.clear_geo, Gazetteer)
+        clear_cities = self.get_matcher('clear_cities', self.clear_cities, Gazetteer)
+        inclusion_words = self.get_matcher('inclusion_words', self.inclusion_words)
+        for query, lemma in zip(queries, lemmas):
+            if not stop_words.search(lemma):
+                if clear_geo.search(lemma):
                     geo_queries.append([query[0], query[1], query[2], lemma])
-                # elif self.regularity_check(lemma, self.inclusion_words + list(self.clear_cities)):
-                elif self.regularity_check(lemma, list(self.clear_cities)) or \
-                        self.regularity_check(lemma, self.inclusion_words):
+                elif clear_cities.search(lemma) or inclusion_words.search(lemma):
                     main_queries.append([query[0], query[1], query[2], lemma])
                 else:
                     to_delete.append(query[0])
@@ -163,19 +233,33 @@ class ClustererSearchKeysService:
         buf = copy.deepcopy(to_delete)
         self.deleted.append([buf, 'Мэйн дубликаты стадия ' + str(stage)])
 
+        self.annotate_queries(geo_fiches, [query[0] for query in geo_queries + main_queries],
+                              [query[0] for query in geo_queries])
+
         return geo_queries, main_queries
 
+    # Save lemmas of words of queries and lemmas without geo of geo queries, so reports make no morphology
+    def annotate_queries(self, geo_fiches: GeoFiches, queries: list, geo_queries: list):
+        new_queries = [query for query in dict.fromkeys(queries) if query not in self.word_lemmas]
+        for query, word_lemmas in zip(new_queries, geo_fiches.word_lemmas(new_queries)):
+            self.word_lemmas[query] = word_lemmas
+
+        all_geo = self.get_matcher('all_geo', self.clear_geo.union(self.clear_cities), Gazetteer)
+        new_queries = [query for query in dict.fromkeys(geo_queries) if query not in self.geo_free_lemmas]
+        without_geo = [geo_fiches.delete_geo(query, all_geo, self.word_lemmas[query]) for query in new_queries]
+        for query, lemma in zip(new_queries, geo_fiches.lemma_of_queries(without_geo)):
+            self.geo_free_lemmas[query] = lemma
+
     # Make query for queries by XMLRiver
     def get_search_results(self, queries: list, stage: int):
         results = list()
         relatives_keys_list = list()
         relatives_questions_list = list()
 
-        pool = Pool(NUM_THREADS)
         try:
             only_keys = [_[0] for _ in queries]
             print('STAGE:', stage)
-            for key, links, rel_keys, rel_questions in tqdm(pool.imap(self.query, only_keys), total=len(only_keys)):
+            for key, links, rel_keys, rel_questions in self.scheduler.fetch(only_keys, self.query_keys, stage):
                 results.append([key, links])
                 relatives_keys_list += rel_keys.split('|')
                 relatives_questions_list += rel_questions.split('|')
@@ -184,6 +268,7 @@ class ClustererSearchKeysService:
             raise Exception('Error: ' + str(e))
 
         self.made_queries += queries
+        print('Requests saved:', self.scheduler.stats(stage))
 
         to_delete = list()
         relatives_keys_list = self.del_duplicates(relatives_keys_list, to_delete=to_delete)
@@ -192,33 +277,68 @@ class ClustererSearchKeysService:
 
         return results, relatives_keys_list, relatives_questions_list
 
+    # Return query rows of keys in order of keys, rows saved in checkpoint are not requested again
+    def query_keys(self, keys: list) -> list:
+        rows = [None] * len(keys)
+        saved = self.checkpoint.get_rows(keys) if self.checkpoint is not None else dict()
+        missed = list()
+        for i, key in enumerate(keys):
+            if key in saved:
+                rows[i] = saved[key]
+            else:
+                missed.append(i)
+
+        if len(saved) > 0:
+            print('Keys from checkpoint:', len(keys) - len(missed))
+
+        def on_row(index: int, row: tuple):
+            rows[missed[index]] = row
+            if self.checkpoint is not None:
+                self.checkpoint.put_row(row[0], row)
+
+        self.request_keys([keys[i] for i in missed], on_row)
+        return rows
+
+    # Request keys, on_row(index of key, query row) is called in this process as soon as row is ready
+    def request_keys(self, keys: list, on_row):
+        if not self.async_mode:
+            with Pool(NUM_THREADS) as pool:
+                for index, row in enumerate(tqdm(pool.imap(partial(query_worker, self.river), keys), total=len(keys))):
+                    on_row(index, row)
+            return
+
+        async def collect():
+            with tqdm(total=len(keys)) as progress:
+                async for index, key, result in self.river.iter_query_items_async(keys, self.async_concurrency):
+                    on_row(index, self.query_row(key, result))
+                    progress.update()
+
+        asyncio.run(collect())
+
     # Return key and urls from search engine request with key
     def query(self, key: str) -> (str, str, str, str):
-        error = None
-        for i in range(3):
-            try:
-                result = self.river.get_query_items_with_params(key)
-                item_urls = []
-                for item in result['sites']:
-                    item_urls.append(item.url)
-
-                relatives_keys = result['relatives'] if 'relatives' in result.keys() else []
-                relatives_questions = result['questions'] if 'questions' in result.keys() else []
+        return query_worker(self.river, key)
 
-                return key, ' '.join(item_urls), '|'.join(relatives_keys), '|'.join(relatives_questions)
+    # Return key, urls, relatives keys and relatives questions of query data
+    @staticmethod
+    def query_row(key: str, result: dict) -> (str, str, str, str):
+        item_urls = []
+        for item in result['sites']:
+            item_urls.append(item.url)
 
-            except Exception as e:
-                error = e
+        relatives_keys = result['relatives'] if 'relatives' in result.keys() else []
+        relatives_questions = result['questions'] if 'questions' in result.keys() else []
 
-        if error is not None:
-            raise Exception('Stopped in ' + key + ' error: ' + str(error))
+        return key, ' '.join(item_urls), '|'.join(relatives_keys), '|'.join(relatives_questions)
 
     # Make new queries by relatives
     def relatives_to_queries(self, relatives_keys: list, relatives_questions: list, stage: int) -> list:
-        geo_fiches = GeoFiches(NatashaTokenizer())
+        geo_fiches = self.get_geo_fiches()
 
-        new_queries = [[_, -2-10 * stage, -2-10 * stage, geo_fiches.lemma_of_query(_)] for _ in relatives_keys]
-        new_queries += [[_, -3-10 * stage, -3-10 * stage, geo_fiches.lemma_of_query(_)] for _ in relatives_questions]
+        lemmas = geo_fiches.lemma_of_queries(relatives_keys + relatives_questions)
+        new_queries = [[_, -2-10 * stage, -2-10 * stage, lemma] for _, lemma in zip(relatives_keys, lemmas)]
+        new_queries += [[_, -3-10 * stage, -3-10 * stage, lemma]
+                        for _, lemma in zip(relatives_questions, lemmas[len(relatives_keys):])]
 
         # Del made queries
         unique_new_queries = list()
@@ -239,18 +359,37 @@ class ClustererSearchKeysService:
 
     # Get data from search engine
     def get_stats(self):
-        # Get first queries
-        gsc_queries = list()
-        for url in tqdm(self.urls):
-            gsc_queries += self.get_gsc_queries(url)
-
-        queries = [[_, -1, -1] for _ in self.main_container_names]
-        queries += [[_, -1, -1] for _ in self.geo_container_names]
-        queries += self.filter_gsc_queries(gsc_queries)
-        del gsc_queries
-
-        stage = 1
-        for step in range(COUNT_OF_EXTRA_REQUESTS):
+        last_stage = None
+        if self.checkpoint is not None:
+            if self.resume:
+                last_stage = self.checkpoint.load_last_stage()
+            else:
+                self.checkpoint.clear()
+
+        if last_stage is not None:
+            first_step = last_stage[0]
+            queries = self.restore_stage(last_stage[1])
+            print('Resumed after step', first_step)
+        else:
+            # Get first queries
+            gsc_queries = list()
+            for url_queries in self.get_gsc_queries_bulk(self.urls):
+                gsc_queries += url_queries
+
+            queries = [[_, -1, -1] for _ in self.main_container_names]
+            queries += [[_, -1, -1] for _ in self.geo_container_names]
+            queries += self.filter_gsc_queries(gsc_queries)
+            del gsc_queries
+
+            first_step = 0
+            self.save_stage(first_step, queries)
+
+        stage = 1 + 3 * first_step
+        for step in range(first_step, COUNT_OF_EXTRA_REQUESTS):
+            # Relatives of previous step gave no new queries
+            if step > 0 and len(queries) == 0:
+                break
+
             # Sort queries
             geo_queries, main_queries = self.sort_queries(queries, stage)
             self.geo_queries += geo_queries
@@ -269,86 +408,130 @@ class ClustererSearchKeysService:
             queries = self.relatives_to_queries(relatives_keys, relatives_questions, stage)
             stage += 1
 
-            if len(queries) == 0:
-                break
+            self.save_stage(step + 1, queries)
+
+    # Save state of finished step to checkpoint, queries - queries of next step
+    def save_stage(self, step: int, queries: list):
+        if self.checkpoint is None:
+            return
+        self.checkpoint.save_stage(step, {
+            'queries': queries,
+            'made_queries': self.made_queries,
+            'results_queries': self.results_queries,
+            'results': self.results,
+            'geo_queries': self.geo_queries,
+            'old_anchors': self.old_anchors,
+            'deleted': self.deleted,
+            'word_lemmas': self.word_lemmas,
+            'geo_free_lemmas': self.geo_free_lemmas
+        })
+
+    # Restore state saved by save_stage, return queries of next step
+    def restore_stage(self, state: dict) -> list:
+        self.made_queries = state['made_queries']
+        self.results_queries = state['results_queries']
+        self.results = state['results']
+        self.geo_queries = state['geo_queries']
+        self.old_anchors = state['old_anchors']
+        self.deleted = state['deleted']
+        self.word_lemmas = state.get('word_lemmas', dict())
+        self.geo_free_lemmas = state.get('geo_free_lemmas', dict())
+        return state['queries']
 
     # Return clusters of self.normalised_keys with similarity [0..1]
+    # Clusters of results by urls. First clustering of similarity is made by batch cluster_list and kept,
+    # results added since the previous call are added to it one by one
     def make_clusters(self, similarity: float) -> list:
         only_urls = [key[1] for key in self.results]
-        clusters = ClusteringService.cluster_list(only_urls, similarity)
+        if similarity <= 0:
+            return ClusteringService.cluster_list(only_urls, similarity)
+
+        clustering = self.clusterings.get(similarity)
+        if clustering is None or clustering.data != only_urls[:len(clustering)]:
+            clustering = IncrementalClustering(similarity)
+            clustering.seed(only_urls)
+            self.clusterings[similarity] = clustering
+        else:
+            clustering.add(only_urls[len(clustering):])
+        return list(clustering.clusters)
+
+    # Return dict similarity -> clusters of results, similarity of urls is computed once for all levels.
+    # Kept incremental clusterings are only extended if they cover the beginning of results
+    def make_clusters_multi(self, similarities: list) -> dict:
+        only_urls = [key[1] for key in self.results]
+        clusterings = [self.clusterings.get(similarity) for similarity in similarities]
+        if all(clustering is not None and clustering.data == only_urls[:len(clustering)]
+               for clustering in clusterings):
+            return {similarity: self.make_clusters(similarity) for similarity in similarities}
+
+        clusters = ClusteringService.cluster_list_multi(only_urls, similarities)
+        for similarity, classes in clusters.items():
+            if similarity > 0:
+                clustering = IncrementalClustering(similarity)
+                clustering.seed(only_urls, classes)
+                self.clusterings[similarity] = clustering
         return clusters
 
+    # Write clusters one by one: {"clusters": [...]} for .json, cluster per line for .ndjson/.jsonl,
+    # .gz/.zst suffix compresses the file. Read lazily with report_writer.iter_report(file_out, 'clusters')
     def make_report_to_json(self, clusters: list, file_out: str):
-        printed = []
-        out_obj = {'clusters': []}
-        for cluster in clusters:
-            if cluster not in printed:
-                cluster_obj = {'keys': [], 'urls': []}
-                printed.append(cluster)
-                for i in range(len(clusters)):
-                    if clusters[i] == cluster:
-                        cluster_obj['keys'].append(self.results[i][0])
-                        cluster_obj['urls'].append(self.results[i][1].split(' '))
-
-                out_obj['clusters'].append(cluster_obj)
-
-        with open(file_out, "w", encoding='utf-8') as write_file:
-            json.dump(out_obj, write_file, ensure_ascii=False)
+        with ReportWriter(file_out, root='clusters') as writer:
+            for members in ClusteringService.group_clusters(clusters).values():
+                writer.write({
+                    'keys': [self.results[i][0] for i in members],
+                    'urls': [self.results[i][1].split(' ') for i in members]
+                })
 
     def make_report_to_sheets(self, clusters: list, document_id: str, list_name: str, anchors: bool = False):
         output_data = []
-        printed = []
         clusters_pos = []
         to_delete = list()
 
         shift = 2
-        geo_fiches = GeoFiches(NatashaTokenizer())
-        all_geo = self.clear_geo.union(self.clear_cities)
-        for cluster in clusters:
-            if cluster not in printed:
-                printed.append(cluster)
-
-                cluster_buf = []
-                container_flag = False
-                for i in range(len(clusters)):
-                    if clusters[i] == cluster:
-                        cluster_buf.append([''] + self.results_queries[i])
-
-                        # Удаляем гео
-                        cluster_buf[-1][1] = geo_fiches.delete_geo(cluster_buf[-1][1], all_geo)
-
-                        if self.results_queries[i][1] == -1:
-                            cluster_buf[-1][0] = cluster_buf[-1][1]
-                            container_flag = True
-                        elif self.results_queries[i][1] == -32:
-                            cluster_buf[-1][0] = 'ПЗ_rs_1'
-                        elif self.results_queries[i][1] == -33:
-                            cluster_buf[-1][0] = 'ПЗ_rq_1'
-                        elif self.results_queries[i][1] == -62:
-                            cluster_buf[-1][0] = 'ПЗ_rs_2'
-                        elif self.results_queries[i][1] == -63:
-                            cluster_buf[-1][0] = 'ПЗ_rq_2'
-
-                cluster_buf_clear = self.del_duplicates(cluster_buf, index=1, to_delete=to_delete)
-
-                if len(cluster_buf_clear) > 1:
-                    if anchors is True and container_flag:
-                        start_pos = len(output_data) + shift
-                        output_data += cluster_buf_clear
-                        end_pos = len(output_data) + shift - 1
-                        output_data.append(['', '', '', ''])
-                        clusters_pos.append([start_pos, end_pos])
-                    elif anchors is False and container_flag is False:
-                        start_pos = len(output_data) + shift
-                        output_data += cluster_buf_clear
-                        end_pos = len(output_data) + shift - 1
-                        output_data.append(['', '', '', ''])
-                        clusters_pos.append([start_pos, end_pos])
+        geo_fiches = self.get_geo_fiches()
+        all_geo = self.get_matcher('all_geo', self.clear_geo.union(self.clear_cities), Gazetteer)
+        for members in ClusteringService.group_clusters(clusters).values():
+            cluster_buf = []
+            container_flag = False
+            for i in members:
+                cluster_buf.append([''] + self.results_queries[i])
+
+                # Удаляем гео
+                cluster_buf[-1][1] = geo_fiches.delete_geo(cluster_buf[-1][1], all_geo,
+                                                           self.word_lemmas.get(cluster_buf[-1][1]))
+
+                if self.results_queries[i][1] == -1:
+                    cluster_buf[-1][0] = cluster_buf[-1][1]
+                    container_flag = True
+                elif self.results_queries[i][1] == -32:
+                    cluster_buf[-1][0] = 'ПЗ_rs_1'
+                elif self.results_queries[i][1] == -33:
+                    cluster_buf[-1][0] = 'ПЗ_rq_1'
+                elif self.results_queries[i][1] == -62:
+                    cluster_buf[-1][0] = 'ПЗ_rs_2'
+                elif self.results_queries[i][1] == -63:
+                    cluster_buf[-1][0] = 'ПЗ_rq_2'
+
+            cluster_buf_clear = self.del_duplicates(cluster_buf, index=1, to_delete=to_delete)
+
+            if len(cluster_buf_clear) > 1:
+                if anchors is True and container_flag:
+                    start_pos = len(output_data) + shift
+                    output_data += cluster_buf_clear
+                    end_pos = len(output_data) + shift - 1
+                    output_data.append(['', '', '', ''])
+                    clusters_pos.append([start_pos, end_pos])
+                elif anchors is False and container_flag is False:
+                    start_pos = len(output_data) + shift
+                    output_data += cluster_buf_clear
+                    end_pos = len(output_data) + shift - 1
+                    output_data.append(['', '', '', ''])
+                    clusters_pos.append([start_pos, end_pos])
 
         print_list = []
         if not anchors:
-            buf = [geo_fiches.lemma_of_query(geo_fiches.delete_geo(_[0], self.clear_geo.union(self.clear_cities)))
-                   for _ in self.geo_queries]
+            buf = [self.geo_free_lemmas[_[0]] if _[0] in self.geo_free_lemmas
+                   else geo_fiches.lemma_of_query(geo_fiches.delete_geo(_[0], all_geo)) for _ in self.geo_queries]
 
             clusters = ClusteringService.cluster_list(buf, 1.0)
             for i, cluster in enumerate(clusters):
@@ -357,35 +540,22 @@ class ClustererSearchKeysService:
 
         sheets_api = GoogleSheetsApi(self.google_token)
         header = ['id', 'query', 'clicks', 'impressions']
-        # Create list
-        try:
-            if anchors:
-                sheets_api.create_sheet(document_id, list_name, 1 + len(output_data), len(header))
-            else:
-                sheets_api.create_sheet(document_id, list_name, 1 + len(output_data) + len(self.geo_queries),
-                                        len(header))
-            # logger.info("Created new sheet with name: " + name_of_sheet)
-        except Exception as e:
-            # logger.info("Sheet " + name_of_sheet + " already created, recreate")
-            sheets_api.delete_sheet(document_id, list_name)
-            if anchors:
-                sheets_api.create_sheet(document_id, list_name, 1 + len(output_data), len(header))
-            else:
-                sheets_api.create_sheet(document_id, list_name, 1 + len(output_data) + len(print_list),
-                                        len(header))
-
-        sheets_api.put_row_to_sheets(document_id, list_name, 1, 'A', header)
-        sheets_api.put_data_to_sheets(document_id, list_name, 'A2', 'E' + str(1 + len(output_data)), 'ROWS',
-                                      output_data)
+        report = SheetsReportBuilder(sheets_api, document_id, list_name)
+        if anchors:
+            report.add_sheet(1 + len(output_data), len(header))
+        else:
+            report.add_sheet(1 + len(output_data) + len(print_list), len(header))
 
+        report.put_rows(1, 'A', [header])
+        report.put_rows(2, 'A', output_data)
         if not anchors:
-            sheets_api.put_data_to_sheets(document_id, list_name, 'A' + str(2 + len(output_data)),
-                                          'E' + str(1 + len(output_data) + len(print_list)),
-                                          'ROWS', print_list)
+            report.put_rows(2 + len(output_data), 'A', print_list)
         for pos in clusters_pos:
-            sheets_api.create_group(document_id, list_name, pos[0], pos[1], 'ROWS')
+            report.add_group(pos[0], pos[1], 'ROWS')
+        api_calls = report.flush()
 
         self.deleted.append([to_delete, 'Дубликаты в кластере'])
+        print('Sheets API calls: {0}, throttled: {1:.1f} s'.format(api_calls, sheets_api.throttled_time))
 
     def clear(self):
         self.urls.clear()
@@ -393,22 +563,23 @@ class ClustererSearchKeysService:
         self.main_container_names.clear()
         self.clear_geo.clear()
         self.deleted.clear()
+        self.scheduler.clear()
+        self.word_lemmas.clear()
+        self.geo_free_lemmas.clear()
+
+    # Return matcher (WordMatcher or Gazetteer) of words list with name, built again only when words change
+    def get_matcher(self, name: str, words, matcher_class=WordMatcher):
+        words = frozenset(str(word).lower() for word in words)
+        matcher = self.matchers.get(name)
+        if matcher is None or matcher.words != words or not isinstance(matcher, matcher_class):
+            matcher = matcher_class(words)
+            self.matchers[name] = matcher
+        return matcher
 
     # Return "direct" including words in list dictionary in string data.
     @staticmethod
     def regularity_check(data: str, dictionary: list):
-        including = False
-        data_str = str(data).lower()
-
-        for word in dictionary:
-            including = including or (
-                    re.search(r'^' + word.lower() + '[^A-Za-zА-ЯЁа-яё]|[^A-Za-zА-ЯЁа-яё]' + word.lower() +
-                              '[^A-Za-zА-ЯЁа-яё]|[^A-Za-zА-ЯЁа-яё]' + word.lower() + '$'
-                              , data_str) is not None)
-            if including is True:
-                break
-
-        return including
+        return WordMatcher(dictionary).search(data)
 
     # Del duplicates in list by index
     @staticmethod
@@ -1,16 +1,216 @@
+import re
+import math
 import numpy as np
+import scipy.sparse as sp
+
+from math import gcd
+from functools import reduce
 
 from tqdm import tqdm
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+# Rows of the similarity graph computed by one sparse product
+SIMILARITY_BLOCK_SIZE = 2000
+TOKEN_PATTERN = re.compile(r'[^ ]*')
+# Cost of similarity of one prefix candidate pair in products of the sparse product
+CANDIDATE_COST = 25
 
 
 class ClusteringService:
     @staticmethod
     def cluster_list(data: list, duplicates_uniqueness: float):
-        vectors, duplicate_matrix = ClusteringService.get_duplicate_matrix(data)
+        if duplicates_uniqueness >= 1.0:
+            return ClusteringService.exact_duplicates(data)
+
+        if duplicates_uniqueness <= 0:
+            # Every pair passes the threshold, the graph would be dense anyway
+            vectors, duplicate_matrix = ClusteringService.get_duplicate_matrix(data)
+        else:
+            vectors, duplicate_matrix = ClusteringService.get_similarity_graph(data, duplicates_uniqueness)
         return ClusteringService.cluster(vectors, duplicate_matrix, duplicates_uniqueness)
 
+    # Return dict duplicates_uniqueness -> classes, same as cluster_list for every threshold.
+    # Similarity is computed once: the graph is pruned at the lowest threshold and grouped per threshold.
+    @staticmethod
+    def cluster_list_multi(data: list, thresholds: list) -> dict:
+        result = dict()
+        graph_thresholds = list()
+        for duplicates_uniqueness in dict.fromkeys(thresholds):
+            if duplicates_uniqueness >= 1.0:
+                result[duplicates_uniqueness] = ClusteringService.exact_duplicates(data)
+            else:
+                graph_thresholds.append(duplicates_uniqueness)
+
+        if len(graph_thresholds) > 0:
+            lowest = min(graph_thresholds)
+            if lowest <= 0:
+                vectors, duplicate_matrix = ClusteringService.get_duplicate_matrix(data)
+            else:
+                vectors, duplicate_matrix = ClusteringService.get_similarity_graph(data, lowest)
+            for duplicates_uniqueness in graph_thresholds:
+                result[duplicates_uniqueness] = ClusteringService.cluster(vectors, duplicate_matrix,
+                                                                          duplicates_uniqueness)
+
+        return {duplicates_uniqueness: result[duplicates_uniqueness] for duplicates_uniqueness in thresholds}
+
+    # Return dict cluster id -> indexes of members. Clusters are in order of first member, members in list order.
+    @staticmethod
+    def group_clusters(clusters: list) -> dict:
+        groups = dict()
+        for i, cluster in enumerate(clusters):
+            groups.setdefault(cluster, []).append(i)
+        return groups
+
+    # Return classes of token-identical strings (first index of the group) in O(n) without similarity matrix.
+    # Same as cluster_list(data, 1.0): strings without tokens get -1, proportional token counts are one group.
+    @staticmethod
+    def exact_duplicates(data: list) -> list:
+        duplicate_classes = [-1 for _ in range(len(data))]
+        groups = dict()
+        for i, string in enumerate(data):
+            key = ClusteringService.token_bag(string)
+            if key:
+                duplicate_classes[i] = groups.setdefault(key, i)
+
+        return duplicate_classes
+
+    # Return canonical sorted token bag of string as tokenized by get_vectors
+    @staticmethod
+    def token_bag(string: str) -> tuple:
+        counts = ClusteringService.token_counts(string)
+        if len(counts) == 0:
+            return ()
+
+        divider = reduce(gcd, counts.values())
+        return tuple(sorted((token, count // divider) for token, count in counts.items()))
+
+    # Return dict token -> count of string as tokenized by get_vectors
+    @staticmethod
+    def token_counts(string: str) -> dict:
+        counts = dict()
+        for token in TOKEN_PATTERN.findall(string.lower()):
+            if token != '':
+                counts[token] = counts.get(token, 0) + 1
+        return counts
+
+    # Return sparse vectors of data with the empty token removed
+    @staticmethod
+    def get_vectors(data: list) -> sp.csr_matrix:
+        vectorizer = CountVectorizer(token_pattern=TOKEN_PATTERN.pattern)
+        vectors = vectorizer.fit_transform(data).tocsr()
+
+        # Del empty
+        tokens = vectorizer.get_feature_names_out()
+        empty = np.flatnonzero(tokens == '')
+        if len(empty) > 0:
+            vectors.data[vectors.indices == empty[0]] = 0
+            vectors.eliminate_zeros()
+
+        return vectors
+
+    # Return vectors and sparse similarity graph of data. The graph keeps only pairs with rounded cosine
+    # similarity >= duplicates_uniqueness, so memory grows with the number of similar pairs instead of n^2.
+    # top_k limits the number of neighbours kept per row (approximate, None - keep all).
+    # candidates: all - every pair sharing a token is computed by sparse product; prefix - only pairs sharing
+    # a token of prefix index (see _prefix_matrix) are computed; auto - prefix if it is expected to be cheaper.
+    # The graph is the same for every candidates mode
+    @staticmethod
+    def get_similarity_graph(data: list, duplicates_uniqueness: float, block_size: int = SIMILARITY_BLOCK_SIZE,
+                             top_k: int = None, candidates: str = 'auto'):
+        vectors = ClusteringService.get_vectors(data)
+        normalized = normalize(vectors.astype(np.float64), norm='l2', copy=True)
+        normalized_t = normalized.T.tocsr()
+
+        if candidates not in ('auto', 'all', 'prefix'):
+            raise Exception('Unknown candidates mode: ' + str(candidates))
+        prefix = None
+        if candidates != 'all':
+            prefix = ClusteringService._prefix_matrix(normalized, duplicates_uniqueness)
+            # Products of sparse product ~ sum of squared token frequencies
+            all_cost = np.sum(np.diff(normalized_t.indptr).astype(np.float64) ** 2)
+            prefix_cost = np.sum(np.bincount(prefix.indices, minlength=prefix.shape[1]).astype(np.float64) ** 2)
+            if candidates == 'auto' and prefix_cost * CANDIDATE_COST >= all_cost:
+                prefix = None
+        prefix_t = prefix.T.tocsr() if prefix is not None else None
+
+        rows, cols, values = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+        for start in range(0, normalized.shape[0], block_size):
+            if prefix is None:
+                block = (normalized[start:start + block_size] @ normalized_t).tocoo()
+                similarity = np.round(block.data, 2)
+            else:
+                block = (prefix[start:start + block_size] @ prefix_t).tocoo()
+                similarity = ClusteringService._pairs_similarity(normalized, block.row.astype(np.int64) + start,
+                                                                 block.col.astype(np.int64))
+            mask = similarity >= duplicates_uniqueness
+            block_rows = block.row[mask].astype(np.int64) + start
+            block_cols = block.col[mask].astype(np.int64)
+            similarity = similarity[mask]
+
+            if top_k is not None:
+                block_rows, block_cols, similarity = ClusteringService._top_k(block_rows, block_cols,
+                                                                              similarity, top_k)
+
+            rows.append(block_rows)
+            cols.append(block_cols)
+            values.append(similarity)
+
+        size = normalized.shape[0]
+        graph = sp.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                              shape=(size, size))
+        graph.sort_indices()
+
+        return vectors, graph
+
+    # Return rounded cosine similarity of pairs of normalized rows, products are summed in token order
+    # as by the sparse product of get_similarity_graph, so values are the same
+    @staticmethod
+    def _pairs_similarity(normalized: sp.csr_matrix, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        products = normalized[rows].multiply(normalized[cols]).tocsr()
+        products.sort_indices()
+        similarity = np.zeros(len(rows))
+        np.add.at(similarity, np.repeat(np.arange(len(rows)), np.diff(products.indptr)), products.data)
+        return np.round(similarity, 2)
+
+    # Return binary matrix of prefix tokens of rows, it is inverted index token (url) -> rows when transposed.
+    # Tokens are ordered from rare to frequent, prefix ends when norm of the rest of the row can't reach
+    # the threshold, so every pair above the threshold shares its first common token in prefixes of both rows
+    # and pairs sharing only frequent tokens are not candidates
+    @staticmethod
+    def _prefix_matrix(normalized: sp.csr_matrix, duplicates_uniqueness: float) -> sp.csr_matrix:
+        # Rounding to 2 digits lets pairs from threshold - 0.005 pass
+        bound = duplicates_uniqueness - 0.005 - 1e-9
+
+        size, tokens = normalized.shape
+        frequency = np.bincount(normalized.indices, minlength=tokens)
+        rank = np.empty(tokens, dtype=np.int64)
+        rank[np.lexsort((np.arange(tokens), frequency))] = np.arange(tokens)
+
+        lengths = np.diff(normalized.indptr)
+        row_ids = np.repeat(np.arange(size), lengths)
+        order = np.lexsort((rank[normalized.indices], row_ids))
+        squares = normalized.data[order] ** 2
+
+        # Norm^2 of the token and all tokens after it in the row
+        row_totals = np.bincount(row_ids, weights=squares, minlength=size)
+        before = np.cumsum(squares) - squares - np.repeat(np.cumsum(row_totals) - row_totals, lengths)
+        in_prefix = np.sqrt(np.maximum(row_totals[row_ids] - before, 0)) >= bound
+
+        return sp.csr_matrix((np.ones(int(in_prefix.sum())), (row_ids[in_prefix],
+                                                               normalized.indices[order][in_prefix])),
+                             shape=normalized.shape)
+
+    # Keep top_k most similar pairs of every row
+    @staticmethod
+    def _top_k(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, top_k: int):
+        order = np.lexsort((-values, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        starts = np.searchsorted(rows, rows, side='left')
+        mask = np.arange(len(rows)) - starts < top_k
+        return rows[mask], cols[mask], values[mask]
+
     @staticmethod
     def get_duplicate_matrix(data: list):
         # Vectorize
@@ -35,8 +235,47 @@ class ClusteringService:
 
         return vectors, duplicate_matrix
 
+    # mode: vectorized - numpy kernel, reference - plain python loop over every cell
+    @staticmethod
+    def cluster(vectors, duplicate_matrix,  duplicates_uniqueness, mode: str = 'vectorized'):
+        if mode == 'reference':
+            if sp.issparse(duplicate_matrix):
+                duplicate_matrix = duplicate_matrix.toarray()
+            return ClusteringService.cluster_reference(vectors, duplicate_matrix, duplicates_uniqueness)
+
+        if sp.issparse(duplicate_matrix):
+            return ClusteringService.cluster_graph(duplicate_matrix, duplicates_uniqueness)
+
+        return ClusteringService.cluster_vectorized(duplicate_matrix, duplicates_uniqueness)
+
+    # Greedy grouping on boolean adjacency: every accepted duplicate narrows the candidate mask with its row
+    @staticmethod
+    def cluster_vectorized(duplicate_matrix: np.ndarray, duplicates_uniqueness):
+        adjacency = np.round(duplicate_matrix, 2) >= duplicates_uniqueness
+        size = len(adjacency)
+        duplicate_classes = np.full(size, -1)
+        free = np.ones(size, dtype=bool)
+
+        for i in tqdm(range(size), total=size):
+            if free[i]:
+                candidates = adjacency[i] & free
+                duplicates = []
+                j = -1
+                while True:
+                    rest = candidates[j + 1:]
+                    if not rest.any():
+                        break
+                    j += 1 + int(np.argmax(rest))
+                    duplicates.append(j)
+                    candidates &= adjacency[j]
+
+                duplicate_classes[duplicates] = i
+                free[duplicates] = False
+
+        return duplicate_classes.tolist()
+
     @staticmethod
-    def cluster(vectors: np.ndarray, duplicate_matrix: np.ndarray,  duplicates_uniqueness):
+    def cluster_reference(vectors, duplicate_matrix: np.ndarray,  duplicates_uniqueness):
         duplicate_classes = [-1 for _ in range(len(vectors))]
 
         for i in tqdm(range(len(duplicate_matrix)), total=len(duplicate_matrix)):
@@ -60,3 +299,149 @@ class ClusteringService:
 
         return duplicate_classes
 
+    # Same greedy grouping as cluster over sparse similarity graph from get_similarity_graph
+    @staticmethod
+    def cluster_graph(graph: sp.csr_matrix, duplicates_uniqueness):
+        size = graph.shape[0]
+        duplicate_classes = [-1 for _ in range(size)]
+        neighbours = [set(graph.indices[graph.indptr[i]:graph.indptr[i + 1]]
+                          [graph.data[graph.indptr[i]:graph.indptr[i + 1]] >= duplicates_uniqueness])
+                      for i in range(size)]
+
+        for i in tqdm(range(size), total=size):
+            if duplicate_classes[i] == -1:
+                duplicates = []
+                for j in sorted(neighbours[i]):
+                    if duplicate_classes[j] == -1 and all(j in neighbours[duplicate] for duplicate in duplicates):
+                        duplicates.append(j)
+
+                for duplicate_id in duplicates:
+                    duplicate_classes[duplicate_id] = i
+
+        return duplicate_classes
+
+
+class IncrementalClustering:
+    def __init__(self, duplicates_uniqueness: float):
+        """
+            Greedy clustering of growing list of strings. After every add clusters are the same as
+            ClusteringService.cluster_list of all added strings in the same order: new string joins the first
+            cluster which members are all its neighbours, otherwise it starts own cluster.
+            Only strings sharing one of the rarest tokens of the new one (inverted index) are compared with it.
+            :param duplicates_uniqueness: similarity threshold in (0, 1], 1.0 - token-identical strings
+        """
+        if duplicates_uniqueness <= 0:
+            raise Exception('Incremental clustering needs positive duplicates_uniqueness')
+        self.duplicates_uniqueness = duplicates_uniqueness
+
+        self.data = list()
+        self.clusters = list()
+        # Cluster id -> indexes of members
+        self.members = dict()
+        # Token -> indexes of strings with the token
+        self.index = dict()
+        # Index of string -> dict token -> normalized count
+        self.vectors = dict()
+        # Token bag -> cluster id, used when duplicates_uniqueness >= 1.0
+        self.bags = dict()
+
+    def __len__(self):
+        return len(self.data)
+
+    # Replace state with clusters of data made by batch ClusteringService.cluster_list (same threshold),
+    # clusters are computed by cluster_list if None. Only index of tokens is built, similarity is not computed
+    def seed(self, data: list, clusters: list = None):
+        if clusters is None:
+            clusters = ClusteringService.cluster_list(data, self.duplicates_uniqueness) if len(data) > 0 else []
+        if len(clusters) != len(data):
+            raise Exception('Count of clusters differs from count of strings')
+
+        self.data = list(data)
+        self.clusters = list(clusters)
+        self.members = {cluster: members for cluster, members in ClusteringService.group_clusters(clusters).items()
+                        if cluster != -1}
+        self.index = dict()
+        self.vectors = dict()
+        self.bags = dict()
+        for i, (string, cluster) in enumerate(zip(self.data, self.clusters)):
+            if cluster == -1:
+                continue
+            if self.duplicates_uniqueness >= 1.0:
+                self.bags.setdefault(ClusteringService.token_bag(string), cluster)
+            else:
+                self._index(i, self._vector(ClusteringService.token_counts(string)))
+
+    # Add strings to the end, return their cluster ids
+    def add(self, data: list) -> list:
+        start = len(self.data)
+        for string in tqdm(data, total=len(data)):
+            self.data.append(string)
+            self.clusters.append(self._assign(string, len(self.data) - 1))
+        return self.clusters[start:]
+
+    # Return cluster id of string added with index i
+    def _assign(self, string: str, i: int) -> int:
+        if self.duplicates_uniqueness >= 1.0:
+            bag = ClusteringService.token_bag(string)
+            if not bag:
+                return -1
+            cluster = self.bags.setdefault(bag, i)
+            self.members.setdefault(cluster, []).append(i)
+            return cluster
+
+        counts = ClusteringService.token_counts(string)
+        if len(counts) == 0:
+            return -1
+
+        vector = self._vector(counts)
+        scores = dict()
+        for j in self._candidates(vector):
+            other = self.vectors[j]
+            score = 0.0
+            for token, value in vector:
+                if token in other:
+                    score += value * other[token]
+            scores[j] = score
+
+        self._index(i, vector)
+
+        neighbours = set()
+        if len(scores) > 0:
+            ids = np.fromiter(scores.keys(), dtype=np.int64, count=len(scores))
+            similarity = np.round(np.fromiter(scores.values(), dtype=np.float64, count=len(scores)), 2)
+            neighbours = set(ids[similarity >= self.duplicates_uniqueness].tolist())
+
+        cluster = i
+        for leader in sorted(set(self.clusters[j] for j in neighbours)):
+            if all(member in neighbours for member in self.members[leader]):
+                cluster = leader
+                break
+
+        self.members.setdefault(cluster, []).append(i)
+        return cluster
+
+    # Return [(token, normalized count)] in token order, same arithmetic as get_similarity_graph
+    @staticmethod
+    def _vector(counts: dict) -> list:
+        norm = math.sqrt(sum(count * count for count in counts.values()))
+        return [(token, counts[token] / norm) for token in sorted(counts)]
+
+    # Return indexes of strings sharing a prefix token with vector. Tokens are taken from rare to frequent
+    # while the rest of vector can reach the threshold, string sharing only later tokens is below it
+    def _candidates(self, vector: list) -> set:
+        # Rounding to 2 digits lets pairs from threshold - 0.005 pass
+        bound = self.duplicates_uniqueness - 0.005 - 1e-9
+        rest = sum(value * value for _, value in vector)
+        candidates = set()
+        for token, value in sorted(vector, key=lambda item: len(self.index.get(item[0], ()))):
+            if math.sqrt(max(rest, 0.0)) < bound:
+                break
+            candidates.update(self.index.get(token, ()))
+            rest -= value * value
+        return candidates
+
+    # Save vector of string with index i to inverted index
+    def _index(self, i: int, vector: list):
+        self.vectors[i] = dict(vector)
+        for token, _ in vector:
+            self.index.setdefault(token, []).append(i)
@@ -0,0 +1,44 @@
+# Compare NatashaTokenizer startup: models loaded per instance (old behaviour) vs shared lazy registry.
+# Run from repository root: python -m benchmarks.bench_natasha_startup
+import time
+
+from natasha import Segmenter, MorphVocab, NewsEmbedding, NewsMorphTagger, NewsNERTagger
+
+from Modules.Tokenizer import natasha_models
+from Modules.Tokenizer.natasha_tokenizer import NatashaTokenizer
+
+# Count of GeoFiches(NatashaTokenizer()) made by one service run
+INSTANCES = 7
+
+
+def load_per_instance():
+    emb = NewsEmbedding()
+    NewsNERTagger(emb)
+    Segmenter()
+    MorphVocab()
+    NewsMorphTagger(emb)
+
+
+def load_shared():
+    tokenizer = NatashaTokenizer()
+    tokenizer.natasha_segmenter
+    tokenizer.natasha_morph_vocab
+    tokenizer.natasha_morph_tagger
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    for _ in range(INSTANCES):
+        load_per_instance()
+    per_instance = time.perf_counter() - start
+
+    natasha_models.MODELS.clear()
+    start = time.perf_counter()
+    for _ in range(INSTANCES):
+        load_shared()
+    shared = time.perf_counter() - start
+
+    print('Instances: {0}'.format(INSTANCES))
+    print('Per instance models: {0:.3f} s'.format(per_instance))
+    print('Shared lazy models: {0:.3f} s'.format(shared))
+    print('Speedup: {0:.1f}x'.format(per_instance / shared))
@@ -0,0 +1,42 @@
+# Compare clear_string: check of every char in ALPHABET list + stop words list (old path)
+# vs compiled regex + frozenset stop words (utils.normalize).
+# Run from repository root: python -m benchmarks.bench_normalize
+import time
+
+from utils.normalize import clear_strings
+
+ALPHABET = ["а", "б", "в", "г", "д", "е", "ё", "ж", "з", "и", "й", "к", "л", "м", "н", "о", " ",
+            "п", "р", "с", "т", "у", "ф", "х", "ц", "ч", "ш", "щ", "ъ", "ы", "ь", "э", "ю", "я",
+            "a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k", "l", "m", "n", "o", "p", "q",
+            "r", "s", "t", "u", "v", "w", "x", "y", "z"]
+ALPHABET = list(map(lambda x: x.upper(), ALPHABET)) + ALPHABET
+# Same size as nltk russian stop words
+STOP_WORDS = ['в', 'на', 'и', 'с', 'по', 'для', 'от', 'до'] + ['stop{0}'.format(i) for i in range(143)]
+QUERIES = ['ремонт телефонов в Минске цена', 'замена экрана iPhone 12 на дом', 'мастер на час, недорого!',
+           'массаж в г. Уфа (отзывы)', 'купить шкаф-купе 2х3 м в Бресте'] * 20000
+
+
+def old_clear_string(string):
+    string = ''.join([letter if letter in ALPHABET else ' ' for letter in string])
+    string = ' '.join([word for word in string.split() if word not in STOP_WORDS])
+    return string
+
+
+def measure(clear) -> float:
+    start = time.perf_counter()
+    clear(QUERIES)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    chars = sum(len(query) for query in QUERIES)
+    stop_words = frozenset(STOP_WORDS)
+    assert [old_clear_string(query) for query in QUERIES[:5]] == clear_strings(QUERIES[:5], stop_words)
+
+    old = measure(lambda queries: [old_clear_string(query) for query in queries])
+    new = measure(lambda queries: clear_strings(queries, stop_words))
+
+    print('Queries: {0}, chars: {1}'.format(len(QUERIES), chars))
+    print('ALPHABET list: {0:.3f} s ({1:.0f} chars/s)'.format(old, chars / old))
+    print('utils.normalize: {0:.3f} s ({1:.0f} chars/s)'.format(new, chars / new))
+    print('Speedup: {0:.1f}x'.format(old / new))
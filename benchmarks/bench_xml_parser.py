@@ -0,0 +1,44 @@
+# Compare XMLRiver report parsing: BeautifulSoup error check + html.parser (old path) vs one lxml iterparse pass.
+# Run from repository root: python -m benchmarks.bench_xml_parser
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from Modules.Xml_river.xml_river import XmlRiver
+from Modules.Xml_river.xml_parser import parse_report
+
+FIXTURES = os.path.join('Modules', 'Xml_river', 'Test', 'fixtures')
+REPEATS = 300
+
+
+def parse_soup(report: str) -> dict:
+    errors = BeautifulSoup(report, 'lxml')
+    if errors.yandexsearch.response.error is not None:
+        raise Exception('XmlRiver response error: ' + str(errors.yandexsearch.response.error.string))
+    return XmlRiver.parse_query_items_with_params(report)
+
+
+def measure(parse, reports: list) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for report in reports:
+            parse(report)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    reports = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith('.xml') and 'error' not in name:
+            with open(os.path.join(FIXTURES, name), encoding='utf-8') as file:
+                reports.append(file.read())
+
+    count = REPEATS * len(reports)
+    soup = measure(parse_soup, reports)
+    lxml = measure(parse_report, reports)
+
+    print('Reports: {0}'.format(count))
+    print('BeautifulSoup: {0:.3f} s ({1:.0f} reports/s)'.format(soup, count / soup))
+    print('lxml iterparse: {0:.3f} s ({1:.0f} reports/s)'.format(lxml, count / lxml))
+    print('Speedup: {0:.1f}x'.format(soup / lxml))
@@ -1,18 +1,21 @@
 import os
 import sys
-import json
 
 from api_objects import BaseContainer
 from Modules.сlusterer_search_keys import ClustererSearchKeysService
 from Modules.GoogleApi import GoogleSheetsApi
-from Modules.GeoFiches.geo_fiches import GeoFiches
-from Modules.Tokenizer.natasha_tokenizer import NatashaTokenizer
+from Modules.report_writer import ReportWriter
 
 CONFIG = {
     "XMLRiver": {
         "xml_river_user": "1660",
         "xml_river_key": "9d9ea875799adf551c8329d0a6dcf50ed168f9b8",
         "group_by": 10,
+        "cache": {
+            "path": "Environment/serp_cache.sqlite",
+            "ttl": 7 * 24 * 60 * 60,
+            "offline": False
+        },
         "Google": {
             "default_country_id": 2112,
             "default_loc_id": 1001493,
@@ -41,6 +44,9 @@ if __name__ == '__main__':
     GOOGLE_DOCUMENT_IN = '1LRE5onYv7TB6XIQhlUiAuOVrul-c8jvP3l8OKQx_CkA'
     LIST_NAME = '/remont-tehniki2'
     MAX_COUNT_OF_LINKS = 1000       # 0 - no limit
+    LEMMA_CACHE = 'Environment/lemmas.sqlite'
+    CHECKPOINT = 'Environment/checkpoint.sqlite'
+    RESUME = False                  # continue get_stats of crashed run from CHECKPOINT
 
     stop_words = ['купить', 'отзывы', 'бесплатно', 'спб', 'форум']
     inclusion_words = ['стоимость', 'цена', 'прайс', 'заказать', 'заказ', 'стоит', 'цены', 'на дом', 'на час', 'услуги']
@@ -69,7 +75,8 @@ if __name__ == '__main__':
             base_cluster.append(child)
         base_clusters.append(base_cluster)
 
-    service = ClustererSearchKeysService(API_TOKEN, SEARCH_ENGINE, CONFIG)
+    service = ClustererSearchKeysService(API_TOKEN, SEARCH_ENGINE, CONFIG, LEMMA_CACHE, CHECKPOINT)
+    service.resume = RESUME
     service.set_containers(base_clusters[0])
     service.clear()
 
@@ -96,7 +103,7 @@ if __name__ == '__main__':
     main_names = []
     clear_mains = set()
     old_anchors = set()
-    geo_fiches = GeoFiches(NatashaTokenizer())
+    geo_fiches = service.get_geo_fiches()
     for i in range(len(raw_data[0])):
         if len(raw_data) > 6 and len(raw_data[6]) > i and len(raw_data[6][i]) > 0:
             buf = str(raw_data[6][i]).split(',')
@@ -127,12 +134,16 @@ if __name__ == '__main__':
     print('Get stats')
     service.get_stats()
     print('Get clusters')
-    clusters_anchors = service.make_clusters(0.8)
-    clusters_six = service.make_clusters(0.6)
+    clusters = service.make_clusters_multi([0.8, 0.6])
+    clusters_anchors = clusters[0.8]
+    clusters_six = clusters[0.6]
     print('Make reports')
 
     service.make_report_to_sheets(clusters_anchors, GOOGLE_DOCUMENT_OUT, LIST_NAME+'_clusters_anchors', True)
     service.make_report_to_sheets(clusters_six, GOOGLE_DOCUMENT_OUT, LIST_NAME+'_clusters_six', False)
 
-    with open(LIST_NAME+'_del.json', "w", encoding='utf-8') as write_file:
-        json.dump(service.deleted, write_file, ensure_ascii=False, indent=4)
+    print('Lemma cache:', service.lemma_cache.stats())
+    service.lemma_cache.flush()
+
+    with ReportWriter(LIST_NAME+'_del.json') as writer:
+        writer.write_all(service.deleted)
@@ -0,0 +1 @@
+from .normalize import clear_string, clear_strings, clear_tokens_text
@@ -0,0 +1,27 @@
+import re
+from typing import Iterable, List
+
+# Runs of chars which are not russian/latin letters or space
+NOT_ALPHABET = re.compile('[^ a-zA-Zа-яА-ЯёЁ]+')
+# Runs of not word chars, used by Tokens
+NOT_WORD = re.compile(r'[\W ]+')
+# "5 класс" -> "5класс"
+CLASS_NUMBER = re.compile('([0-9]) (класс)')
+
+
+def clear_string(string:str, stop_words:frozenset = frozenset()) -> str:
+    '''
+    Заменяет все символы кроме русских/латинских букв пробелом, удаляет стоп-слова и лишние пробелы.
+    stop_words - frozenset (поиск за O(1))
+    '''
+    return ' '.join([word for word in NOT_ALPHABET.sub(' ', string).split() if word not in stop_words])
+
+def clear_strings(strings:Iterable[str], stop_words:frozenset = frozenset()) -> List[str]:
+    return [clear_string(string, stop_words) for string in strings]
+
+def clear_tokens_text(text:str) -> str:
+    '''
+    Очистка текста для utils.tokens.Tokens: склеивает "N класс", убирает "под ключ" и не словесные символы
+    '''
+    text = CLASS_NUMBER.sub(lambda m:f'{m.group(1)}{m.group(2)}', text)
+    return NOT_WORD.sub(' ', text.replace('под ключ', ''))
@@ -0,0 +1,28 @@
+import re
+
+from utils.normalize import clear_string, clear_strings, clear_tokens_text
+
+ALPHABET = list('абвгдеёжзийклмнопрстуфхцчшщъыьэюя abcdefghijklmnopqrstuvwxyz')
+ALPHABET = list(map(lambda x: x.upper(), ALPHABET)) + ALPHABET
+STOP_WORDS = ['в', 'на', 'и']
+
+TEXTS = ['Ремонт телефонов в Минске, цена 25$!', 'iPhone 12 — замена экрана;на дом', '', '   ', 'İstanbul ǅ ñ',
+         'Мастер\tна\nчас', 'ЁЛКА ёлка']
+
+
+def old_clear_string(string, stop_words):
+    string = ''.join([letter if letter in ALPHABET else ' ' for letter in string])
+    return ' '.join([word for word in string.split() if word not in stop_words])
+
+
+def test_clear_string_same_as_alphabet_list():
+    for text in TEXTS:
+        assert clear_string(text, frozenset(STOP_WORDS)) == old_clear_string(text, STOP_WORDS)
+    assert clear_strings(TEXTS, frozenset(STOP_WORDS)) == [old_clear_string(text, STOP_WORDS) for text in TEXTS]
+
+
+def test_clear_tokens_text():
+    text = 'Ремонт под ключ 5 класс, цена!'
+    old = re.sub('[\\W ]', ' ', re.sub('([0-9]) (класс)', lambda m: m.group(1) + m.group(2), text)
+                 .replace('под ключ', ''))
+    assert clear_tokens_text(text).split() == old.split()
@@ -49,9 +49,21 @@ def test_ignore_normalize_words():
     WORDS_IGNORE_NORMALIZE.remove('тестят')
     WORDS_IGNORE_NORMALIZE.remove('тесто')
 
+def test_parse_cache_and_ids():
+    from utils.tokens.tokens import BaseTokens, parse_word
+    parse_word.cache_clear()
+    tokens:Tokens = Tokens('Лает лает лай')
+    tokens2:Tokens = Tokens('лает собака')
+    assert parse_word.cache_info().misses == 3
+    assert parse_word.cache_info().hits == 2
+    assert all(BaseTokens.tokens[i].id == i for i in tokens.ids)
+    assert Tokens.check(tokens, tokens2) == {BaseTokens.tokens[i] for i in tokens.ids & tokens2.ids}
+    assert len(Tokens.check(tokens, tokens2)) == 1
+
 if __name__ == '__main__':
     test_Token()
     test_Tokens()
     test_black_words()
     test_replace_words()
     test_ignore_normalize_words()
+    test_parse_cache_and_ids()
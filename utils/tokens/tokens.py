@@ -1,10 +1,12 @@
 from __future__ import annotations
-import re
-from typing import Dict, List, Set
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 import pymorphy2
 
 from utils.file import load_txt
+from utils.normalize import clear_tokens_text
 
 BLACK_WORDS = [
     "и",
@@ -284,20 +286,37 @@ def set_check_types(mode):
 
 morph = pymorphy2.MorphAnalyzer()
 
+# Максимум слов в кэше разбора pymorphy2
+PARSE_CACHE_SIZE = 100000
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_word(word:str) -> Tuple[str, Optional[str]]:
+    '''
+    Возвращает (normal_form, POS) слова. Кэшируется только разбор pymorphy2 (ограниченный LRU, потокобезопасный),
+    BLACK_WORDS, WORDS_REPLACE и WORDS_IGNORE_NORMALIZE применяются при каждом создании Token
+    '''
+    data:pymorphy2.analyzer.Parse = morph.parse(word)[0]
+    return data.normal_form, str(data.tag.POS) if data.tag.POS else None
+
 class Token:
-    text = None
+    __slots__ = ('word', 'text', 'tag', 'id')
+
     def __init__(self, word:str) -> None:
         self.word:str = word.strip()
-        if self.word.isdigit(): return 
+        self.text:Optional[str] = None
+        self.tag:Optional[str] = None
+        # номер в BaseTokens.tokens, задаётся при добавлении в базу
+        self.id:Optional[int] = None
+        if self.word.isdigit(): return
         if self.word in WORDS_IGNORE_NORMALIZE:
             self.text = self.word
             self.tag = 'NOUN'
         else:
-            data:pymorphy2.analyzer.Parse = morph.parse(self.word)[0]
-            text:str = data.normal_form
+            # pymorphy2 разбирает слово в нижнем регистре, поэтому 'Москва' и 'москва' делят одну запись кэша
+            text, pos = parse_word(self.word.lower())
             self.text:str = WORDS_REPLACE.get(text, text)
-            self.tag:str = str(data.tag.POS) if data.tag.POS else 'NOUN'
-    
+            self.tag:str = pos if pos else 'NOUN'
+
     def __repr__(self) -> str:
         return self.text
 
@@ -309,41 +328,57 @@ class Token:
 
 class BaseTokens:
     base:Dict[str, Token] = dict()
+    # токены по id
+    tokens:List[Token] = list()
+    lock = Lock()
 
     @classmethod
     def get(cls, word):
         if len(word) < 2: return None
         token = Token(word)
         if not token.text or token.text in BLACK_WORDS or CHECK_TYPES(token): return None
-        base_token = cls.base.get(token.text)
-        if base_token: return base_token
-        cls.base.update({token.text:token})
+        with cls.lock:
+            base_token = cls.base.get(token.text)
+            if base_token: return base_token
+            token.id = len(cls.tokens)
+            cls.tokens.append(token)
+            cls.base.update({token.text:token})
         return token
 # https://redsale.by/api/comments?token=6PmWUehjZMugwn8mNxdrVqyG5F3wUmm&sectionId=7659&page=0&size=100
 
 class Tokens:
+    __slots__ = ('text_org', 'ids')
+
     def __init__(self, text:str) -> None:
         self.text_org = text
-        text = re.sub('([0-9]) (класс)', lambda m:f'{m.group(1)}{m.group(2)}', text)
-        self.base_tokens:Set[Token] = Tokens.process_tokens(re.sub('[\W ]', ' ', text.replace('под ключ', '')))
+        # id токенов из BaseTokens
+        self.ids:FrozenSet[int] = Tokens.process_ids(clear_tokens_text(text))
+
+    @property
+    def base_tokens(self) -> Set[Token]:
+        return {BaseTokens.tokens[i] for i in self.ids}
 
     # возвращает набор токенов в виде одной строки
-    def get_text(self):return ' '.join(list(map(lambda x: x.text, self.base_tokens)))
-    
+    def get_text(self):return ' '.join(BaseTokens.tokens[i].text for i in sorted(self.ids))
+
     def __repr__(self) -> str:
         return self.text_org
 
     @classmethod
-    def process_tokens(cls, text:str) -> Set[Token]:
-        tokens = set()
+    def process_ids(cls, text:str) -> FrozenSet[int]:
+        ids = set()
         for word in text.split():
             token = BaseTokens.get(word)
-            if token: tokens.add(token)
-        return tokens
+            if token: ids.add(token.id)
+        return frozenset(ids)
+
+    @classmethod
+    def process_tokens(cls, text:str) -> Set[Token]:
+        return {BaseTokens.tokens[i] for i in cls.process_ids(text)}
 
     @classmethod
     def check(cls, tokens1:Tokens, tokens2:Tokens) -> Set[Token]:
-        return tokens1.base_tokens.intersection(tokens2.base_tokens)
+        return {BaseTokens.tokens[i] for i in tokens1.ids & tokens2.ids}
 
 if __name__ == '__main__':
     q1 = BaseTokens.get('собрать')